@@ -1,463 +1,3564 @@
-import json
-import os
-import sys
-from pathlib import Path
-from typing import Dict, List, Tuple, Any
-
-
-class MinecraftUUIDConverter:
-    def __init__(self, config_path: str = 'Info.json'):
-        self.config = self._load_config(config_path)
-        self.players = self._prepare_players()
-        self.dirs = self._prepare_directories()
-        self.mode_id = 0
-        
-        # Get Python script directory for log file location
-        self.script_dir = Path(__file__).parent
-        self.log_file = self.script_dir / "log.txt"
-        self._setup_logging()
-
-    def _setup_logging(self):
-        """Set up logging to file"""
-        # Clear or create log file
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            f.write(f"Minecraft Online/Offline UUID Converter (with online-mode switching)Log\n")
-            f.write(f"============================\n")
-            f.write(f"Log file location: {self.log_file}\n")
-            f.write(f"Run time: {self._get_current_time()}\n\n")
-        
-        # Redirect stdout to file and console
-        self.original_stdout = sys.stdout
-        sys.stdout = self
-
-    def _get_current_time(self):
-        """Get current time string"""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    def write(self, text):
-        """Override write method to output to both file and console"""
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(text)
-        self.original_stdout.write(text)
-
-    def flush(self):
-        """Override flush method"""
-        self.original_stdout.flush()
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.flush()
-
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """Load configuration file"""
-        with open(config_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
-
-    def _prepare_players(self) -> List[Dict[str, str]]:
-        """Prepare player information"""
-        return [
-            {
-                'name': player['name'],
-                'online_uuid': player['Online_UUID'],
-                'offline_uuid': player['Offline_UUID']
-            }
-            for player in self.config['player']
-        ]
-
-    def _prepare_directories(self) -> List[Tuple[Path, bool]]:
-        """Prepare directory information"""
-        return [
-            (Path(self.config['root_dir']) / folder['name'], folder['change_content'])
-            for folder in self.config['changeUUID_folder_name']
-        ]
-
-    def _determine_mode_from_server_properties(self) -> int:
-        """Determine current mode from server.properties file"""
-        server_properties_path = Path(self.config['root_dir']) / "server.properties"
-        
-        if not server_properties_path.exists():
-            raise FileNotFoundError(f"server.properties file not found: {server_properties_path}")
-        
-        with open(server_properties_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        online_mode_line = None
-        for line in lines:
-            if line.strip().startswith('online-mode='):
-                online_mode_line = line.strip()
-                break
-        
-        if online_mode_line is None:
-            raise ValueError("online-mode setting not found in server.properties")
-        
-        # Parse online-mode value
-        if '=' in online_mode_line:
-            value = online_mode_line.split('=', 1)[1].strip().lower()
-            if value == 'true':
-                print("Current mode: Online (online-mode=true)")
-                return 1  # Online -> Offline
-            elif value == 'false':
-                print("Current mode: Offline (online-mode=false)")
-                return 2  # Offline -> Online
-            else:
-                raise ValueError(f"Invalid online-mode value: {value}")
-        else:
-            raise ValueError("Invalid online-mode line format")
-
-    def _update_server_properties(self):
-        """Update online-mode setting in server.properties"""
-        server_properties_path = Path(self.config['root_dir']) / "server.properties"
-        
-        if not server_properties_path.exists():
-            print(f"Warning: server.properties file not found: {server_properties_path}")
-            return
-        
-        with open(server_properties_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        updated = False
-        for i, line in enumerate(lines):
-            if line.strip().startswith('online-mode='):
-                if self.mode_id == 1:  # Online -> Offline, need to change to false
-                    new_value = 'false'
-                    print("Changing online-mode to: false")
-                else:  # Offline -> Online, need to change to true
-                    new_value = 'true'
-                    print("Changing online-mode to: true")
-                
-                lines[i] = f"online-mode={new_value}\n"
-                updated = True
-                break
-        
-        if updated:
-            with open(server_properties_path, 'w', encoding='utf-8') as file:
-                file.writelines(lines)
-            print("Updated server.properties file")
-        else:
-            print("Warning: online-mode setting not found, server.properties not updated")
-
-    def _update_json_file(self, file_path: Path, update_callback: callable):
-        """Generic JSON file update method"""
-        if not file_path.exists():
-            print(f"Warning: File {file_path} does not exist")
-            return
-
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-
-        update_callback(data)
-
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=4, ensure_ascii=False)
-
-    def _update_uuid_in_list(self, data: List[Dict]):
-        """Update UUIDs in list data"""
-        for item in data:
-            for player in self.players:
-                if item.get('name') == player['name']:
-                    item['uuid'] = (
-                        player['offline_uuid'] if self.mode_id == 1 
-                        else player['online_uuid']
-                    )
-                    break
-
-    def _update_usercache(self):
-        """Update usercache.json"""
-        usercache_path = Path(self.config['root_dir']) / "usercache.json"
-        
-        def update_data(data):
-            self._update_uuid_in_list(data)
-        
-        self._update_json_file(usercache_path, update_data)
-
-    def _update_ops(self):
-        """Update ops.json"""
-        ops_path = Path(self.config['root_dir']) / "ops.json"
-        self._update_json_file(ops_path, self._update_uuid_in_list)
-
-    def _update_usernamecache(self):
-        """Update usernamecache.json"""
-        usernamecache_path = Path(self.config['root_dir']) / "usernamecache.json"
-        
-        def update_data(data: Dict):
-            for old_uuid, username in list(data.items()):
-                for player in self.players:
-                    if username == player['name']:
-                        new_uuid = (
-                            player['offline_uuid'] if self.mode_id == 1 
-                            else player['online_uuid']
-                        )
-                        if old_uuid != new_uuid:
-                            data[new_uuid] = data.pop(old_uuid)
-                        break
-        
-        self._update_json_file(usernamecache_path, update_data)
-
-    def _remove_hyphens(self, uuid: str) -> str:
-        """Remove hyphens from UUID"""
-        return uuid.replace('-', '')
-
-    def _update_file_content(self, file_path: Path):
-        """Update UUIDs in file content"""
-        if not file_path.exists():
-            return
-        
-        file_extension = file_path.suffix.lower()
-        
-        if file_extension == '.json':
-            self._update_json_file_content(file_path)
-        elif file_extension == '.snbt':
-            self._update_snbt_file_content(file_path)
-        else:
-            self._update_binary_file_content(file_path)
-
-    def _update_json_file_content(self, file_path: Path):
-        """Update UUIDs in JSON file content"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            original_content = content
-            
-            for player in self.players:
-                # Get current UUID and target UUID
-                current_uuid = (
-                    player['online_uuid'] if self.mode_id == 1 
-                    else player['offline_uuid']
-                )
-                target_uuid = (
-                    player['offline_uuid'] if self.mode_id == 1 
-                    else player['online_uuid']
-                )
-                
-                # Replace UUID with hyphens
-                content = content.replace(current_uuid, target_uuid)
-                
-                # Replace UUID without hyphens
-                current_uuid_no_hyphen = self._remove_hyphens(current_uuid)
-                target_uuid_no_hyphen = self._remove_hyphens(target_uuid)
-                content = content.replace(current_uuid_no_hyphen, target_uuid_no_hyphen)
-            
-            # Write file if content changed
-            if content != original_content:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(content)
-                print(f"Updated JSON file content: {file_path.name}")
-                
-        except Exception as e:
-            print(f"Error updating JSON file content {file_path}: {e}")
-
-    def _update_snbt_file_content(self, file_path: Path):
-        """Update UUIDs in SNBT file content"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            original_content = content
-            
-            for player in self.players:
-                # Get current UUID and target UUID
-                current_uuid = (
-                    player['online_uuid'] if self.mode_id == 1 
-                    else player['offline_uuid']
-                )
-                target_uuid = (
-                    player['offline_uuid'] if self.mode_id == 1 
-                    else player['online_uuid']
-                )
-                
-                # UUID in SNBT files may exist in various forms:
-                # 1. String with hyphens
-                # 2. String without hyphens
-                # 3. Possibly quoted
-                
-                # Replace UUID with hyphens (handle quoted cases)
-                content = content.replace(f'"{current_uuid}"', f'"{target_uuid}"')
-                content = content.replace(f"'{current_uuid}'", f"'{target_uuid}'")
-                content = content.replace(current_uuid, target_uuid)
-                
-                # Replace UUID without hyphens
-                current_uuid_no_hyphen = self._remove_hyphens(current_uuid)
-                target_uuid_no_hyphen = self._remove_hyphens(target_uuid)
-                content = content.replace(f'"{current_uuid_no_hyphen}"', f'"{target_uuid_no_hyphen}"')
-                content = content.replace(f"'{current_uuid_no_hyphen}'", f"'{target_uuid_no_hyphen}'")
-                content = content.replace(current_uuid_no_hyphen, target_uuid_no_hyphen)
-            
-            # Write file if content changed
-            if content != original_content:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(content)
-                print(f"Updated SNBT file content: {file_path.name}")
-                
-        except Exception as e:
-            print(f"Error updating SNBT file content {file_path}: {e}")
-
-    def _update_binary_file_content(self, file_path: Path):
-        """Update UUIDs in binary file content (like .dat files)"""
-        try:
-            with open(file_path, 'rb') as file:
-                content_bytes = file.read()
-            
-            original_content_bytes = content_bytes
-            
-            for player in self.players:
-                # Get current UUID and target UUID
-                current_uuid = (
-                    player['online_uuid'] if self.mode_id == 1 
-                    else player['offline_uuid']
-                )
-                target_uuid = (
-                    player['offline_uuid'] if self.mode_id == 1 
-                    else player['online_uuid']
-                )
-                
-                # Replace UUID with hyphens (convert to bytes)
-                current_uuid_bytes = current_uuid.encode('utf-8')
-                target_uuid_bytes = target_uuid.encode('utf-8')
-                content_bytes = content_bytes.replace(current_uuid_bytes, target_uuid_bytes)
-                
-                # Replace UUID without hyphens
-                current_uuid_no_hyphen = self._remove_hyphens(current_uuid)
-                target_uuid_no_hyphen = self._remove_hyphens(target_uuid)
-                current_uuid_no_hyphen_bytes = current_uuid_no_hyphen.encode('utf-8')
-                target_uuid_no_hyphen_bytes = target_uuid_no_hyphen.encode('utf-8')
-                content_bytes = content_bytes.replace(current_uuid_no_hyphen_bytes, target_uuid_no_hyphen_bytes)
-            
-            # Write file if content changed
-            if content_bytes != original_content_bytes:
-                with open(file_path, 'wb') as file:
-                    file.write(content_bytes)
-                print(f"Updated binary file content: {file_path.name}")
-                
-        except Exception as e:
-            print(f"Error updating binary file content {file_path}: {e}")
-
-    def _rename_player_files(self, dir_path: Path, change_content: bool):
-        """Rename player data files and update file content if needed"""
-        # Define file extension patterns to process
-        file_patterns = [
-            ('_cyclic.dat', ''),     # uuid_cyclic.dat - put this first!
-            ('.json', ''),           # uuid.json
-            ('.dat_old', ''),        # uuid.dat_old
-            ('.dat', ''),            # uuid.dat
-            ('.snbt', ''),           # uuid.snbt
-        ]
-        
-        for file_path in dir_path.iterdir():
-            if not file_path.is_file():
-                continue
-                
-            for pattern_suffix, special_handler in file_patterns:
-                if file_path.name.endswith(pattern_suffix):
-                    # First rename the file
-                    renamed = self._process_single_file(file_path, pattern_suffix)
-                    
-                    # If content update is needed, update file content
-                    if change_content and renamed:
-                        self._update_file_content(renamed)
-                    break
-
-    def _process_single_file(self, file_path: Path, pattern_suffix: str) -> Path:
-        """Process single file rename, return renamed file path"""
-        filename = file_path.name
-        
-        # Extract UUID part based on different file suffixes
-        if pattern_suffix == '_cyclic.dat':
-            # For _cyclic.dat files, remove _cyclic.dat suffix to get UUID
-            stem = filename[:-11]  # _cyclic.dat is 11 characters
-        elif pattern_suffix == '.json':
-            stem = file_path.stem  # Direct filename without .json
-        elif pattern_suffix == '.dat_old':
-            stem = filename[:-8]   # Remove .dat_old (8 characters)
-        elif pattern_suffix == '.dat':
-            stem = file_path.stem  # Direct filename without .dat
-        elif pattern_suffix == '.snbt':
-            stem = file_path.stem  # Direct filename without .snbt
-        else:
-            return file_path
-        
-        # Find matching player and rename
-        for player in self.players:
-            # Determine current UUID based on current mode
-            if self.mode_id == 1:  # Online -> Offline
-                current_uuid = player['online_uuid']
-                target_uuid = player['offline_uuid']
-            else:  # Offline -> Online
-                current_uuid = player['offline_uuid']
-                target_uuid = player['online_uuid']
-            
-            if stem == current_uuid:
-                # Build new filename
-                if pattern_suffix == '_cyclic.dat':
-                    new_filename = f"{target_uuid}_cyclic.dat"
-                elif pattern_suffix == '.json':
-                    new_filename = f"{target_uuid}.json"
-                elif pattern_suffix == '.dat_old':
-                    new_filename = f"{target_uuid}.dat_old"
-                elif pattern_suffix == '.dat':
-                    new_filename = f"{target_uuid}.dat"
-                elif pattern_suffix == '.snbt':
-                    new_filename = f"{target_uuid}.snbt"
-                
-                new_path = file_path.parent / new_filename
-                
-                # Only rename if new filename is different from original
-                if new_path != file_path:
-                    file_path.rename(new_path)
-                    print(f"Renamed: {file_path.name} -> {new_path.name}")
-                    return new_path
-                else:
-                    print(f"No rename needed: {file_path.name} (same filename)")
-                    return file_path
-        
-        return file_path
-
-    def convert(self):
-        """Main conversion method"""
-        try:
-            # Determine current mode from server.properties
-            self.mode_id = self._determine_mode_from_server_properties()
-            
-            if self.mode_id == 1:
-                print("Mode Change: Online -> Offline")
-            else:
-                print("Mode Change: Offline -> Online")
-
-            # Update UUID configuration files
-            self._update_usercache()
-            self._update_ops()
-            self._update_usernamecache()
-
-            # Process all directories
-            for dir_path, change_content in self.dirs:
-                print(f"Processing directory: {dir_path} (update content: {change_content})")
-                self._rename_player_files(dir_path, change_content)
-
-            # Finally update server.properties
-            self._update_server_properties()
-
-            print("Conversion completed!")
-            print(f"Detailed log saved to: {self.log_file}")
-
-        except Exception as e:
-            print(f"Error during conversion: {e}")
-            raise
-        finally:
-            # Restore stdout
-            sys.stdout = self.original_stdout
-
-
-def main():
-    """Main function"""
-    try:
-        converter = MinecraftUUIDConverter()
-        converter.convert()
-    except FileNotFoundError:
-        print("Error: Configuration file Info.json not found")
-    except json.JSONDecodeError:
-        print("Error: Configuration file format is incorrect")
-    except Exception as e:
-        print(f"Error: {e}")
-
-
-if __name__ == "__main__":
+import argparse
+import asyncio
+import cProfile
+import contextlib
+import csv
+import fnmatch
+import functools
+import hashlib
+import io
+import itertools
+import json
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple, Any, Union, Iterator, Optional, Callable, Iterable, NamedTuple, Set
+
+
+def uuid_to_bytes(uuid_text: str) -> bytes:
+    """Parse a hyphenated or unhyphenated UUID string into 16 bytes"""
+    hex_text = uuid_text.replace('-', '')
+    if len(hex_text) != 32:
+        raise ValueError(f"Invalid UUID: {uuid_text}")
+    return bytes.fromhex(hex_text)
+
+
+def bytes_to_uuid(uuid_bytes: bytes) -> str:
+    """Format 16 bytes as a lowercase hyphenated UUID string"""
+    h = uuid_bytes.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _packed_uuid(value: Union[str, bytes]) -> bytes:
+    """16-byte form of a UUID given as text or as a 16-byte value"""
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) == 16:
+        return bytes(value)
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('ascii')
+    return uuid_to_bytes(value.strip())
+
+
+def offline_uuid(name: str) -> str:
+    """Offline-mode UUID of a player, the name-based (version 3) MD5 of OfflinePlayer:<name>"""
+    digest = bytearray(hashlib.md5(f"OfflinePlayer:{name}".encode('utf-8')).digest())
+    digest[6] = (digest[6] & 0x0F) | 0x30
+    digest[8] = (digest[8] & 0x3F) | 0x80
+    return bytes_to_uuid(bytes(digest))
+
+
+class PlayerTable:
+    """Compact player table: names plus online/offline UUIDs packed as 16-byte values"""
+
+    __slots__ = ('names', 'online', 'offline')
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.online = bytearray()
+        self.offline = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield (name, online_uuid, offline_uuid) for every player"""
+        for index, name in enumerate(self.names):
+            yield name, self.online_uuid(index), self.offline_uuid(index)
+
+    def add(self, name: str, online_uuid: str, offline_uuid: str):
+        """Append a player, validating both UUIDs"""
+        try:
+            online_bytes = uuid_to_bytes(online_uuid)
+            offline_bytes = uuid_to_bytes(offline_uuid)
+        except ValueError:
+            raise ValueError(f"Invalid UUID for player {name}")
+        self.add_packed(name, online_bytes, offline_bytes)
+
+    def add_packed(self, name: str, online_bytes: bytes, offline_bytes: bytes):
+        """Append a player whose UUIDs are already 16-byte values"""
+        self.names.append(name)
+        self.online += online_bytes
+        self.offline += offline_bytes
+
+    def extend(self, other: 'PlayerTable'):
+        """Append every player of another table"""
+        self.names += other.names
+        self.online += other.online
+        self.offline += other.offline
+
+    def fingerprint(self) -> str:
+        """SHA-256 of the packed online and offline UUIDs, which changes with the player set"""
+        digest = hashlib.sha256(self.online)
+        digest.update(self.offline)
+        return digest.hexdigest()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, Any, Any]], source: str) -> 'PlayerTable':
+        """Build a table from (name, online UUID, offline UUID) rows
+
+        UUIDs may be text or 16-byte values; an empty offline UUID is derived
+        from the name. Row numbers of invalid rows are reported against source.
+        """
+        players = cls()
+        for row_number, (name, online_value, offline_value) in enumerate(rows, 1):
+            try:
+                if not name:
+                    raise ValueError("missing name")
+                if not online_value:
+                    raise ValueError("missing online UUID")
+                online_bytes = _packed_uuid(online_value)
+                offline_bytes = _packed_uuid(offline_value) if offline_value else uuid_to_bytes(offline_uuid(name))
+            except ValueError as e:
+                raise ValueError(f"Invalid player in {source}, row {row_number}: {e}") from e
+            players.add_packed(name, online_bytes, offline_bytes)
+        return players
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> 'PlayerTable':
+        """Load a name,online_uuid,offline_uuid CSV file, with or without a header row"""
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as file:
+            reader = csv.reader(file)
+            first_row = next(reader, None)
+            if first_row is None:
+                return cls()
+            columns = [column.strip().lower() for column in first_row]
+            if 'name' in columns:
+                indexes = [columns.index(column) if column in columns else None
+                           for column in ('name', 'online_uuid', 'offline_uuid')]
+                rows = reader
+            else:
+                indexes = [0, 1, 2]
+                rows = itertools.chain([first_row], reader)
+
+            def select(row: List[str]) -> Tuple[str, str, str]:
+                return tuple(
+                    row[index].strip() if index is not None and index < len(row) else ''
+                    for index in indexes
+                )
+            return cls.from_rows((select(row) for row in rows if row), csv_path.name)
+
+    @classmethod
+    def from_sqlite(cls, db_path: Path, query: str) -> 'PlayerTable':
+        """Load players from a SQLite database, query selects name, online and offline UUID"""
+        connection = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+        try:
+            return cls.from_rows(connection.execute(query), db_path.name)
+        finally:
+            connection.close()
+
+    def validate(self) -> Tuple[List[str], List[str]]:
+        """Check for ambiguous players, return (conflicts, duplicate warnings)
+
+        Two players must not share a name, an online UUID or an offline UUID, and
+        no online UUID may be another player's offline UUID. Rows listed twice
+        with the same UUIDs are harmless and only reported as duplicates.
+        """
+        conflicts: List[str] = []
+        duplicates: List[str] = []
+        by_name: Dict[str, int] = {}
+        by_online: Dict[bytes, int] = {}
+        by_offline: Dict[bytes, int] = {}
+        for index, name in enumerate(self.names):
+            online_bytes = bytes(self.online[index * 16:index * 16 + 16])
+            offline_bytes = bytes(self.offline[index * 16:index * 16 + 16])
+            first = by_name.setdefault(name.lower(), index)
+            if first != index:
+                if self.online_uuid(first) == bytes_to_uuid(online_bytes) and \
+                        self.offline_uuid(first) == bytes_to_uuid(offline_bytes):
+                    duplicates.append(f"Player {name} is listed more than once")
+                    continue
+                conflicts.append(f"Player {name} is listed with different UUIDs")
+                continue
+            for seen, key, kind in ((by_online, online_bytes, 'online'), (by_offline, offline_bytes, 'offline')):
+                first = seen.setdefault(key, index)
+                if first != index:
+                    conflicts.append(f"Players {self.names[first]} and {name} share the {kind} UUID "
+                                     f"{bytes_to_uuid(key)}")
+
+        for online_bytes, index in by_online.items():
+            other = by_offline.get(online_bytes)
+            if other is not None and other != index:
+                conflicts.append(f"Online UUID of {self.names[index]} is the offline UUID of {self.names[other]}")
+        return conflicts, duplicates
+
+    def online_uuid(self, index: int) -> str:
+        """Get hyphenated online UUID of the player at index"""
+        return bytes_to_uuid(self.online[index * 16:index * 16 + 16])
+
+    def offline_uuid(self, index: int) -> str:
+        """Get hyphenated offline UUID of the player at index"""
+        return bytes_to_uuid(self.offline[index * 16:index * 16 + 16])
+
+    def lookup(self, mode_id: int) -> 'PlayerLookup':
+        """Build lookup tables for a conversion direction"""
+        return PlayerLookup(self, mode_id)
+
+
+class PlayerLookup:
+    """Direction-aware lookup tables: player name and source UUID to target UUID"""
+
+    __slots__ = ('by_name', 'by_uuid')
+
+    def __init__(self, players: PlayerTable, mode_id: int):
+        # Online -> Offline reads online UUIDs and writes offline ones, and vice versa
+        if mode_id == 1:
+            source, target = players.online, players.offline
+        else:
+            source, target = players.offline, players.online
+
+        self.by_name: Dict[str, str] = {}
+        # Source UUID -> target UUID, in both hyphenated and unhyphenated form
+        self.by_uuid: Dict[str, str] = {}
+        for index, name in enumerate(players.names):
+            start = index * 16
+            source_uuid = bytes_to_uuid(source[start:start + 16])
+            target_uuid = bytes_to_uuid(target[start:start + 16])
+            # The first player listed wins, like the old linear scans
+            self.by_name.setdefault(name, target_uuid)
+            self.by_uuid.setdefault(source_uuid, target_uuid)
+            self.by_uuid.setdefault(source_uuid.replace('-', ''), target_uuid.replace('-', ''))
+
+
+class UUIDMatcher:
+    """Single-pass replacer for hyphenated and unhyphenated UUIDs"""
+
+    # A run of hex digits and hyphens long enough to hold a UUID in either form;
+    # runs are matched whole so that a UUID right after other hex digits is still found
+    _TEXT_PATTERN = re.compile(r'[0-9a-fA-F-]{32,}')
+    _BYTES_PATTERN = re.compile(rb'[0-9a-fA-F-]{32,}')
+
+    # Prefilter patterns: hex runs that may start a text UUID, and 4-int array
+    # headers and *Most long tags that are followed by a binary NBT UUID
+    _HEX_RUN = re.compile(rb'[0-9a-fA-F]{8,}')
+    _BINARY_CANDIDATES = re.compile(rb'\x00\x00\x00\x04|Most')
+    # Up to this many prefixes, one bytes.find() per prefix beats scanning hex runs
+    FIND_LIMIT = 32
+    # Bytes a UUID match can span; every match lies within one run of them
+    _UUID_CHARACTERS = b'0123456789abcdefABCDEF-'
+    # A UUID is at most 36 bytes, so one starting in the last 35 bytes of a chunk may be cut off
+    STREAM_OVERLAP = 35
+    # Longest run of UUID characters carried whole from one chunk to the next
+    STREAM_CARRY_LIMIT = 1 << 20
+
+    def __init__(self, replacements: Dict[str, str], keep_identity: bool = False):
+        # UUIDs that map to themselves never change content, so leave them out
+        # unless the matcher is only used to find UUIDs
+        self.text_map: Dict[str, str] = {
+            current_uuid: target_uuid
+            for current_uuid, target_uuid in replacements.items()
+            if keep_identity or current_uuid != target_uuid
+        }
+        self.bytes_map: Dict[bytes, bytes] = {
+            current.encode('ascii'): target.encode('ascii')
+            for current, target in self.text_map.items()
+        }
+        # 16-byte form, as stored in NBT int arrays and long pairs
+        self.binary_map: Dict[bytes, bytes] = {
+            uuid_to_bytes(current): uuid_to_bytes(target)
+            for current, target in self.text_map.items()
+            if len(current) == 36
+        }
+        # Hyphenated and bare forms share their first 8 hex digits
+        self._text_prefixes = {current[:8] for current in self.bytes_map}
+        self._most_halves = {source[:8] for source in self.binary_map}
+
+    def __len__(self) -> int:
+        return len(self.text_map)
+
+    def sub(self, content: Union[str, bytes]) -> Tuple[Union[str, bytes], int]:
+        """Replace every mapped UUID in one scan, return new content and replacement count"""
+        if isinstance(content, str):
+            pattern, table = self._TEXT_PATTERN, self.text_map
+        else:
+            pattern, table = self._BYTES_PATTERN, self.bytes_map
+        count = 0
+
+        def replace(match):
+            nonlocal count
+            run = match.group()
+            pieces = []
+            start = 0
+            for offset, candidate in self._run_hits(run, table):
+                pieces.append(run[start:offset])
+                pieces.append(table[candidate])
+                start = offset + len(candidate)
+            if not pieces:
+                return run
+            count += len(pieces) // 2
+            pieces.append(run[start:])
+            return run[:0].join(pieces)
+
+        if not table:
+            return content, 0
+        return pattern.sub(replace, content), count
+
+    def find(self, content: Union[str, bytes]) -> Iterator[Tuple[int, Union[str, bytes]]]:
+        """Yield (offset, UUID) for every mapped UUID in content"""
+        if isinstance(content, str):
+            pattern, table = self._TEXT_PATTERN, self.text_map
+        else:
+            pattern, table = self._BYTES_PATTERN, self.bytes_map
+        if not table:
+            return
+        for match in pattern.finditer(content):
+            for offset, candidate in self._run_hits(match.group(), table):
+                yield match.start() + offset, candidate
+
+    def find_chunks(self, chunks: Iterable[bytes]) -> Iterator[Tuple[int, bytes]]:
+        """Yield (offset, UUID) for every mapped UUID in a stream of byte chunks
+
+        Matches never span a byte outside a run of UUID characters, so only the
+        trailing run of each chunk is carried over and searched again with the
+        next one; the results are the same as for the whole content. A run
+        longer than STREAM_CARRY_LIMIT is cut, keeping its last STREAM_OVERLAP
+        bytes, so memory stays bounded whatever the input.
+        """
+        if not self.bytes_map:
+            return
+        carried = b''
+        base = 0
+        reported = 0
+        for chunk in chunks:
+            buffer = carried + chunk
+            run_start = len(buffer.rstrip(self._UUID_CHARACTERS))
+            # Matches starting before the cut lie completely inside the buffer
+            cut = max(len(buffer) - self.STREAM_OVERLAP, run_start)
+            if self.may_contain(buffer):
+                for offset, candidate in self.find(buffer):
+                    if offset >= cut:
+                        break
+                    # A carried run is searched again; skip what it already yielded
+                    if base + offset >= reported:
+                        yield base + offset, candidate
+                        reported = base + offset + len(candidate)
+            if len(buffer) - run_start <= self.STREAM_CARRY_LIMIT:
+                resume = run_start
+            else:
+                resume = max(cut, reported - base)
+            carried = buffer[resume:]
+            base += resume
+        for offset, candidate in self.find(carried):
+            if base + offset >= reported:
+                yield base + offset, candidate
+
+    def contains(self, content: Union[str, bytes]) -> bool:
+        """Check whether content holds any mapped UUID, stopping at the first one"""
+        return next(self.find(content), None) is not None
+
+    def may_contain(self, content: Union[bytes, mmap.mmap], binary: bool = False) -> bool:
+        """Cheap prefilter, False only if content provably holds no mapped UUID
+
+        Text UUIDs are looked up by their first 8 hex digits; with binary, NBT int
+        arrays of length 4 and *Most long tags are checked for binary UUIDs too.
+        """
+        if not self.bytes_map:
+            return False
+        if binary:
+            for match in self._BINARY_CANDIDATES.finditer(content):
+                end = match.end()
+                if match.group() == b'Most':
+                    if content[end:end + 8] in self._most_halves:
+                        return True
+                elif content[end:end + 16] in self.binary_map:
+                    return True
+
+        prefixes = self._text_prefixes
+        if len(prefixes) <= self.FIND_LIMIT:
+            return any(content.find(prefix) != -1 for prefix in prefixes)
+        for match in self._HEX_RUN.finditer(content):
+            run = match.group()
+            if any(run[i:i + 8] in prefixes for i in range(len(run) - 7)):
+                return True
+        return False
+
+    @staticmethod
+    def _run_hits(run, table) -> Iterator[Tuple[int, Any]]:
+        """Yield (offset, UUID) for the mapped UUIDs in a run of hex digits and hyphens, leftmost first"""
+        if run in table:
+            yield 0, run
+            return
+        hyphen = '-' if isinstance(run, str) else b'-'
+        i = 0
+        while i <= len(run) - 32:
+            # A hyphen after the first 8 digits rules out the bare form and vice versa
+            candidate = run[i:i + 36] if run[i + 8:i + 9] == hyphen else run[i:i + 32]
+            if candidate in table:
+                yield i, candidate
+                i += len(candidate)
+            else:
+                i += 1
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+# Content files that are read as (possibly gzip-compressed) NBT
+NBT_EXTENSIONS = ('.dat', '.dat_old', '.nbt')
+
+
+def gzip_header(raw: bytes) -> Tuple[int, int]:
+    """Parse a gzip header, return (header length, compression level)"""
+    if raw[:2] != GZIP_MAGIC or raw[2] != 8:
+        raise ValueError("Not gzip data")
+    flags = raw[3]
+    pos = 10
+    if flags & 4:  # FEXTRA
+        pos += 2 + struct.unpack_from('<H', raw, pos)[0]
+    if flags & 8:  # FNAME
+        pos = raw.index(b'\x00', pos) + 1
+    if flags & 16:  # FCOMMENT
+        pos = raw.index(b'\x00', pos) + 1
+    if flags & 2:  # FHCRC
+        pos += 2
+
+    # XFL records whether the writer used maximum (2) or fastest (4) compression
+    level = {2: 9, 4: 1}.get(raw[8], 6)
+    return pos, level
+
+
+def gzip_unpack(raw: bytes) -> Tuple[bytes, bytes, int]:
+    """Split gzip data into (original header, decompressed payload, compression level)"""
+    pos, level = gzip_header(raw)
+    payload = zlib.decompressobj(-zlib.MAX_WBITS).decompress(raw[pos:])
+    return raw[:pos], payload, level
+
+
+def gzip_pack(header: bytes, payload: bytes, level: int) -> bytes:
+    """Compress payload as gzip, reusing the original header"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(payload) + compressor.flush()
+    # The header is kept byte for byte, so an FHCRC in it still matches; only the trailer is recomputed
+    trailer = struct.pack('<II', zlib.crc32(payload), len(payload) & 0xFFFFFFFF)
+    return header + body + trailer
+
+
+@contextlib.contextmanager
+def replacing_file(file_path: Path) -> Iterator[Any]:
+    """Open a temporary file that replaces file_path (or becomes it) once it is written completely"""
+    temp_path = file_path.with_name(file_path.name + '.tmp')
+    try:
+        with open(temp_path, 'wb') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        if file_path.exists():
+            os.chmod(temp_path, file_path.stat().st_mode & 0o7777)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def relative_key(root_dir: Path, file_path: Path) -> str:
+    """Path of a file relative to the server root, as stored in the index, records and journals"""
+    return file_path.relative_to(root_dir).as_posix()
+
+
+def save_json(file_path: Path, data: Dict[str, Any], **options):
+    """Write a JSON file through replacing_file, so the old one stays intact until the new one is complete"""
+    with replacing_file(file_path) as file:
+        file.write(json.dumps(data, separators=(',', ':'), **options).encode('utf-8'))
+
+
+def load_record(record_path: Path, version: int, root_dir: Path) -> Optional[Dict[str, Any]]:
+    """Read a JSON record written by save_json, None if there is none for this version and server"""
+    if not record_path.exists():
+        return None
+    with open(record_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if data.get('version') != version or data.get('root_dir') != str(root_dir):
+        return None
+    return data
+
+
+# Compressed files are decompressed in chunks of this size
+COMPRESSED_CHUNK_SIZE = 1 << 20
+# Uncompressed files larger than this are rewritten and scanned chunk by chunk
+STREAM_CHUNK_SIZE = 1 << 20
+# Enough bytes for the root tag id, the longest root name and the tag after it
+NBT_SNIFF_SIZE = 3 + 0xFFFF + 1
+
+
+def sniff_compression(head: bytes) -> Optional[str]:
+    """Identify gzip or zlib data from its first two bytes, None for anything else"""
+    if head[:2] == GZIP_MAGIC:
+        return 'gzip'
+    # zlib: deflate method, window of at most 32 KiB and a header check multiple of 31
+    if len(head) >= 2 and head[0] & 0x0F == 8 and head[0] >> 4 <= 7 and (head[0] << 8 | head[1]) % 31 == 0:
+        return 'zlib'
+    return None
+
+
+def sniff_nbt(head: bytes) -> bool:
+    """Check whether uncompressed data starts like Java NBT
+
+    The root must be a compound tag whose 2-byte name length fits the data and
+    is followed by a valid tag id, the first child or the closing TAG_End.
+    """
+    if len(head) < 4 or head[0] != 0x0A:
+        return False
+    name_end = 3 + int.from_bytes(head[1:3], 'big')
+    return name_end < len(head) and head[name_end] <= 12
+
+
+def decompress_chunks(chunks: Iterable[bytes], compression: str) -> Tuple[bytes, bytes, int]:
+    """Decompress gzip or zlib data given in chunks, return (header, payload, level)
+
+    header and level are what compress_payload() needs to recompress the payload
+    with the original settings. Raises ValueError if the data is not valid.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+    try:
+        if compression == 'gzip':
+            header_length, level = gzip_header(first)
+            header = first[:header_length]
+            # Raw deflate after the header, the trailer is checked below
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            first = first[header_length:]
+        else:
+            header = first[:2]
+            # FLEVEL keeps the level only roughly, these levels map back to the same value
+            level = (1, 5, 6, 9)[first[1] >> 6]
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+
+        parts = [decompressor.decompress(first)]
+        for chunk in chunks:
+            parts.append(decompressor.decompress(chunk))
+        parts.append(decompressor.flush())
+    except (IndexError, zlib.error) as e:
+        raise ValueError(f"Invalid {compression} data: {e}") from e
+    if not decompressor.eof:
+        raise ValueError(f"Truncated {compression} data")
+
+    payload = b''.join(parts)
+    if compression == 'gzip':
+        trailer = decompressor.unused_data
+        # Concatenated gzip members are not rebuilt, so leave such files alone
+        if len(trailer) != 8 or struct.unpack('<II', trailer) != (zlib.crc32(payload), len(payload) & 0xFFFFFFFF):
+            raise ValueError("Unsupported gzip trailer")
+    elif decompressor.unused_data:
+        raise ValueError("Trailing data after zlib stream")
+    return header, payload, level
+
+
+def compress_payload(compression: str, header: bytes, payload: bytes, level: int) -> bytes:
+    """Recompress a payload returned by decompress_chunks() with its original settings"""
+    if compression == 'gzip':
+        return gzip_pack(header, payload, level)
+    # CINFO holds the window size the file was written with
+    compressor = zlib.compressobj(level, zlib.DEFLATED, (header[0] >> 4) + 8)
+    return compressor.compress(payload) + compressor.flush()
+
+
+class NBTUUIDPatcher:
+    """Rewrites binary UUIDs in NBT data in place, without building a tag tree
+
+    Modern NBT stores UUIDs as 4-int IntArrays (UUID, Owner, ...), older data and
+    many mods use a pair of longs (UUIDMost/UUIDLeast, OwnerUUIDMost/...). Target
+    UUIDs have the same size as source UUIDs, so every match is patched in place,
+    in a bytearray or a writable memory map. String UUIDs are left to UUIDMatcher.
+    """
+
+    TAG_END, TAG_BYTE, TAG_SHORT, TAG_INT, TAG_LONG, TAG_FLOAT, TAG_DOUBLE = range(7)
+    TAG_BYTE_ARRAY, TAG_STRING, TAG_LIST, TAG_COMPOUND, TAG_INT_ARRAY, TAG_LONG_ARRAY = range(7, 13)
+
+    # Payload size of fixed-size tags
+    _FIXED_SIZES = {TAG_BYTE: 1, TAG_SHORT: 2, TAG_INT: 4, TAG_LONG: 8, TAG_FLOAT: 4, TAG_DOUBLE: 8}
+    # Element size of array tags
+    _ARRAY_SIZES = {TAG_BYTE_ARRAY: 1, TAG_INT_ARRAY: 4, TAG_LONG_ARRAY: 8}
+
+    def __init__(self, binary_map: Dict[bytes, bytes]):
+        self.binary_map = binary_map
+        self._patches: List[Tuple[int, bytes]] = []
+        self._found: List[Tuple[int, bytes]] = []
+
+    def patch(self, data: bytearray) -> int:
+        """Patch every mapped UUID in a named root tag, return the number of replacements"""
+        self._walk(data)
+
+        # Only touch the buffer once the whole document has been parsed
+        for offset, target in self._patches:
+            data[offset:offset + len(target)] = target
+        return len(self._found)
+
+    def find(self, data: bytearray) -> List[Tuple[int, bytes]]:
+        """Find every mapped UUID without patching, return (offset, source UUID bytes)"""
+        self._walk(data)
+        return self._found
+
+    def _walk(self, data: bytearray):
+        """Walk a named root tag, recording patches for every mapped UUID"""
+        self._patches = []
+        self._found = []
+        try:
+            tag_type = data[0]
+            name_length = struct.unpack_from('>H', data, 1)[0]
+            end = self._skip_payload(data, tag_type, 3 + name_length)
+        except (IndexError, KeyError, struct.error):
+            raise ValueError("Not NBT data")
+        if end > len(data):
+            raise ValueError("Truncated NBT data")
+
+    def _skip_payload(self, data: bytearray, tag_type: int, pos: int) -> int:
+        """Walk one tag payload, recording UUID patches, return the position after it"""
+        size = self._FIXED_SIZES.get(tag_type)
+        if size is not None:
+            return pos + size
+
+        if tag_type == self.TAG_COMPOUND:
+            return self._skip_compound(data, pos)
+
+        if tag_type == self.TAG_STRING:
+            return pos + 2 + struct.unpack_from('>H', data, pos)[0]
+
+        if tag_type == self.TAG_LIST:
+            element_type = data[pos]
+            count = struct.unpack_from('>i', data, pos + 1)[0]
+            pos += 5
+            if count <= 0:
+                return pos
+            size = self._FIXED_SIZES.get(element_type)
+            if size is not None:
+                return pos + size * count
+            for _ in range(count):
+                pos = self._skip_payload(data, element_type, pos)
+            return pos
+
+        size = self._ARRAY_SIZES[tag_type]
+        count = struct.unpack_from('>i', data, pos)[0]
+        pos += 4
+        if tag_type == self.TAG_INT_ARRAY and count == 4:
+            self._check_uuid(data, pos, pos + 8)
+        return pos + size * max(count, 0)
+
+    def _skip_compound(self, data: bytearray, pos: int) -> int:
+        """Walk a compound payload, pairing up *Most/*Least long tags"""
+        most_offsets = {}
+        least_offsets = {}
+        while True:
+            tag_type = data[pos]
+            if tag_type == self.TAG_END:
+                break
+            name_length = struct.unpack_from('>H', data, pos + 1)[0]
+            name_start = pos + 3
+            pos = name_start + name_length
+            if tag_type == self.TAG_LONG:
+                name = bytes(data[name_start:pos])
+                if name.endswith(b'Most'):
+                    most_offsets[name[:-4]] = pos
+                elif name.endswith(b'Least'):
+                    least_offsets[name[:-5]] = pos
+            pos = self._skip_payload(data, tag_type, pos)
+
+        for prefix, most_offset in most_offsets.items():
+            least_offset = least_offsets.get(prefix)
+            if least_offset is not None:
+                self._check_uuid(data, most_offset, least_offset)
+        return pos + 1
+
+    def _check_uuid(self, data: bytearray, high_offset: int, low_offset: int):
+        """Record a patch if the two 8-byte halves form a mapped UUID"""
+        source = bytes(data[high_offset:high_offset + 8] + data[low_offset:low_offset + 8])
+        target = self.binary_map.get(source)
+        if target is None:
+            return
+        self._found.append((high_offset, source))
+        self._patches.append((high_offset, target[:8]))
+        self._patches.append((low_offset, target[8:]))
+
+
+class AnvilRegionPatcher:
+    """Rewrites UUIDs in Anvil region files (.mca) one chunk at a time
+
+    A region file starts with an 8 KiB header: 1024 chunk locations (3-byte
+    sector offset, 1-byte sector count) followed by 1024 timestamps. Each chunk
+    is a 4-byte length, a compression type and compressed NBT. Only chunks that
+    change are recompressed and written back; a chunk that outgrows its sectors
+    is moved to the end of the file. Untouched region files are never written.
+    With safe_write, changed region and external chunk files are rebuilt in a
+    temporary file that replaces them, instead of being patched in place.
+    Chunks with LZ4 or custom compression cannot be decoded with the standard
+    library; they are left unchanged and counted.
+    """
+
+    SECTOR_SIZE = 4096
+    HEADER_SIZE = 8192
+    GZIP, ZLIB, UNCOMPRESSED = 1, 2, 3
+    # Chunks too large for the region file are stored in c.<x>.<z>.mcc next to it
+    EXTERNAL_FLAG = 128
+    MAX_SECTORS = 255
+
+    def __init__(self, matcher: UUIDMatcher, before_write: Optional[Callable[[Path], None]] = None,
+                 safe_write: bool = False, scan: Optional[Callable[[bytes], Dict[str, List[int]]]] = None):
+        self.matcher = matcher
+        self.nbt_patcher = NBTUUIDPatcher(matcher.binary_map)
+        self.safe_write = safe_write
+        self.bytes_written = 0
+        # Called with each region or external chunk file before it is written to
+        self.before_write = before_write
+        # Called with the final NBT data of every chunk the prefilter does not rule
+        # out; the UUIDs it finds (offsets within their chunk) are collected in uuids
+        self.scan = scan
+        self.uuids: Dict[str, List[int]] = {}
+        # SHA-256 of the region file as last patched or searched, only kept with scan
+        self.sha256: Optional[str] = None
+
+    def patch_file(self, path: Path) -> Tuple[int, int, int, int]:
+        """Patch one region file, return (chunks scanned, chunks changed, replacements, chunks not decoded)"""
+        with open(path, 'rb') as file:
+            raw = file.read()
+
+        scanned = 0
+        replaced = 0
+        undecoded = 0
+        changed_chunks = []
+        for index, sectors, compression, payload, external_path in self._chunks(path, raw):
+            scanned += 1
+            if payload is None:
+                undecoded += 1
+                continue
+            new_payload, count, data = self._patch_chunk(payload, compression)
+            if count:
+                replaced += count
+                changed_chunks.append((index, sectors, new_payload, compression, external_path))
+            if data is not None:
+                self._scan(data)
+
+        if changed_chunks:
+            self._write_chunks(path, raw, changed_chunks)
+        if self.scan is not None:
+            # Unchanged files are hashed as read, rewritten ones as written
+            self.sha256 = hashlib.sha256(path.read_bytes() if changed_chunks else raw).hexdigest()
+        return scanned, len(changed_chunks), replaced, undecoded
+
+    def find_file(self, path: Path) -> Tuple[int, int]:
+        """Collect the UUIDs scan finds in a region file without changing it, return (chunks scanned, chunks not decoded)"""
+        with open(path, 'rb') as file:
+            raw = file.read()
+        self.sha256 = hashlib.sha256(raw).hexdigest()
+
+        scanned = 0
+        undecoded = 0
+        for _, _, compression, payload, _ in self._chunks(path, raw):
+            scanned += 1
+            if payload is None:
+                undecoded += 1
+                continue
+            _, data, _ = self._decompress(payload, compression)
+            if self.matcher.may_contain(data, binary=True):
+                self._scan(data)
+        return scanned, undecoded
+
+    def _scan(self, data: bytes):
+        """Collect the UUIDs scan finds in the NBT data of one chunk"""
+        if self.scan is None:
+            return
+        for player_uuid, offsets in self.scan(data).items():
+            self.uuids.setdefault(player_uuid, []).extend(offsets)
+
+    def _chunks(self, path: Path, raw: bytes) -> Iterator[Tuple[int, int, int, Optional[bytes], Optional[Path]]]:
+        """Yield (index, sectors, compression, payload, external chunk path) for every chunk of a region file
+
+        The payload is None for chunks with LZ4 or custom compression, which the
+        standard library cannot decode.
+        """
+        if len(raw) < self.HEADER_SIZE:
+            return
+        region_x, region_z = (int(part) for part in path.name.split('.')[1:3])
+        for index in range(1024):
+            location = raw[index * 4:index * 4 + 4]
+            sector_offset = int.from_bytes(location[:3], 'big')
+            if sector_offset == 0:
+                continue
+
+            start = sector_offset * self.SECTOR_SIZE
+            length, compression = struct.unpack_from('>iB', raw, start)
+            external_path = None
+            if compression & self.EXTERNAL_FLAG:
+                chunk_x = region_x * 32 + index % 32
+                chunk_z = region_z * 32 + index // 32
+                external_path = path.parent / f"c.{chunk_x}.{chunk_z}.mcc"
+                compression &= ~self.EXTERNAL_FLAG
+            if compression not in (self.GZIP, self.ZLIB, self.UNCOMPRESSED):
+                # LZ4 and custom compression are not supported by the standard library
+                yield index, location[3], compression, None, external_path
+            elif external_path is not None:
+                with open(external_path, 'rb') as file:
+                    yield index, location[3], compression, file.read(), external_path
+            else:
+                yield index, location[3], compression, raw[start + 5:start + 4 + length], None
+
+    def _decompress(self, payload: bytes, compression: int) -> Tuple[bytes, bytes, int]:
+        """Decompress one chunk, return (gzip header, NBT data, compression level)"""
+        if compression == self.GZIP:
+            return gzip_unpack(payload)
+        if compression == self.ZLIB:
+            # FLEVEL bits of the zlib header: fastest, fast, default or maximum compression
+            return b'', zlib.decompress(payload), (1, 5, 6, 9)[payload[1] >> 6]
+        return b'', payload, 0
+
+    def _patch_chunk(self, payload: bytes, compression: int) -> Tuple[Optional[bytes], int, Optional[bytes]]:
+        """Decompress one chunk and patch it, return (recompressed payload, replacements, final NBT data)
+
+        The final data is None when the prefilter rules out any mapped UUID.
+        """
+        header, data, level = self._decompress(payload, compression)
+        if not self.matcher.may_contain(data, binary=True):
+            return None, 0, None
+
+        data = bytearray(data)
+        replaced = self.nbt_patcher.patch(data)
+        data, string_replaced = self.matcher.sub(bytes(data))
+        replaced += string_replaced
+        if not replaced:
+            return None, 0, data
+
+        if compression == self.GZIP:
+            return gzip_pack(header, data, level), replaced, data
+        if compression == self.ZLIB:
+            return zlib.compress(data, level), replaced, data
+        return data, replaced, data
+
+    def _write_chunks(self, path: Path, raw: bytes, changed_chunks: List[Tuple]):
+        """Write changed chunks back, reallocating sectors for chunks that grew"""
+        end_sector = -(-len(raw) // self.SECTOR_SIZE)
+        if self.before_write is not None:
+            self.before_write(path)
+        # With safe_write the chunks are patched into a copy that then replaces the file
+        with io.BytesIO(raw) if self.safe_write else open(path, 'r+b') as file:
+            file.seek(0)
+            locations = bytearray(file.read(4096))
+            for index, old_sectors, payload, compression, external_path in changed_chunks:
+                if external_path is not None:
+                    # The region file only holds a stub; the chunk data lives in the .mcc file
+                    if self.before_write is not None:
+                        self.before_write(external_path)
+                    with replacing_file(external_path) if self.safe_write else open(external_path, 'wb') as external_file:
+                        external_file.write(payload)
+                    self.bytes_written += len(payload)
+                    continue
+
+                chunk = struct.pack('>iB', len(payload) + 1, compression) + payload
+                sectors = -(-len(chunk) // self.SECTOR_SIZE)
+                if sectors > self.MAX_SECTORS:
+                    raise ValueError(f"Chunk {index} in {path.name} grew beyond {self.MAX_SECTORS} sectors")
+                chunk += b'\x00' * (sectors * self.SECTOR_SIZE - len(chunk))
+
+                if sectors <= old_sectors:
+                    sector_offset = int.from_bytes(locations[index * 4:index * 4 + 3], 'big')
+                else:
+                    sector_offset = end_sector
+                    end_sector += sectors
+                file.seek(sector_offset * self.SECTOR_SIZE)
+                file.write(chunk)
+                self.bytes_written += len(chunk)
+                locations[index * 4:index * 4 + 4] = sector_offset.to_bytes(3, 'big') + bytes([sectors])
+
+            file.seek(0)
+            file.write(locations)
+            self.bytes_written += len(locations)
+            if self.safe_write:
+                with replacing_file(path) as output:
+                    output.write(file.getbuffer())
+
+
+class SQLiteUUIDPatcher:
+    """Rewrites player UUIDs stored in the columns of a SQLite database
+
+    The UUID mapping is loaded into a temporary table in every form a plugin
+    may store it in: hyphenated or bare text in either case, and 16-byte blobs.
+    Each column is then updated with one set-based UPDATE that looks its values
+    up in that table. Only whole values are replaced, and all columns of a
+    database change in a single transaction, so a failure leaves it untouched.
+    """
+
+    # Rows sampled per column to decide whether it holds UUIDs
+    SAMPLE_ROWS = 100
+    _UUID_TEXT = re.compile(r'[0-9a-fA-F]{8}-?(?:[0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}')
+
+    def __init__(self, uuid_map: Dict[str, str], before_write: Optional[Callable[[Path], None]] = None):
+        self.pairs: List[Tuple[Union[str, bytes], Union[str, bytes]]] = []
+        for old_uuid, new_uuid in uuid_map.items():
+            self.pairs.append((old_uuid, new_uuid))
+            self.pairs.append((old_uuid.upper(), new_uuid.upper()))
+            if len(old_uuid) == 36:
+                self.pairs.append((uuid_to_bytes(old_uuid), uuid_to_bytes(new_uuid)))
+        # Called with the database file before its first change
+        self.before_write = before_write
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def _is_uuid_value(self, value: Any) -> bool:
+        if isinstance(value, bytes):
+            return len(value) == 16
+        return isinstance(value, str) and self._UUID_TEXT.fullmatch(value) is not None
+
+    def discover(self, connection: sqlite3.Connection) -> List[Tuple[str, str]]:
+        """Find (table, column) pairs whose sampled values all look like UUIDs"""
+        columns = []
+        tables = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            for column_info in connection.execute(f"PRAGMA table_info({self._quote(table)})").fetchall():
+                column = column_info[1]
+                values = [row[0] for row in connection.execute(
+                    f"SELECT {self._quote(column)} FROM {self._quote(table)} "
+                    f"WHERE {self._quote(column)} IS NOT NULL LIMIT {self.SAMPLE_ROWS}")]
+                if values and all(self._is_uuid_value(value) for value in values):
+                    columns.append((table, column))
+        return columns
+
+    def patch(self, path: Path, columns: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str, int]]:
+        """Patch a database, return (table, column, rows changed) for every changed column
+
+        Columns are discovered when none are given.
+        """
+        connection = sqlite3.connect(path, isolation_level=None, timeout=10)
+        try:
+            if columns is None:
+                columns = self.discover(connection)
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("CREATE TEMP TABLE uuid_map (old PRIMARY KEY, new) WITHOUT ROWID")
+                connection.executemany("INSERT OR IGNORE INTO temp.uuid_map VALUES (?, ?)", self.pairs)
+
+                changed = []
+                for table, column in columns:
+                    table_name, column_name = self._quote(table), self._quote(column)
+                    matches = f"{column_name} IN (SELECT old FROM temp.uuid_map)"
+                    if connection.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name} WHERE {matches})").fetchone()[0]:
+                        if not changed and self.before_write is not None:
+                            self.before_write(path)
+                        cursor = connection.execute(
+                            f"UPDATE {table_name} SET {column_name} = "
+                            f"(SELECT new FROM temp.uuid_map WHERE old = {table_name}.{column_name}) WHERE {matches}"
+                        )
+                        changed.append((table, column, cursor.rowcount))
+                connection.execute("DROP TABLE temp.uuid_map")
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+        return changed
+
+    def find(self, path: Path, columns: Optional[List[Tuple[str, str]]] = None) -> Dict[str, List[str]]:
+        """Find the mapped UUIDs a database still holds, return {hyphenated UUID: ['table.column' per row]}
+
+        Columns are discovered when none are given. The database is only read.
+        """
+        found: Dict[str, List[str]] = {}
+        connection = sqlite3.connect(path, timeout=10)
+        try:
+            if columns is None:
+                columns = self.discover(connection)
+            connection.execute("CREATE TEMP TABLE uuid_map (old PRIMARY KEY, new) WITHOUT ROWID")
+            connection.executemany("INSERT OR IGNORE INTO temp.uuid_map VALUES (?, ?)", self.pairs)
+            for table, column in columns:
+                table_name, column_name = self._quote(table), self._quote(column)
+                for value, in connection.execute(
+                        f"SELECT {column_name} FROM {table_name} "
+                        f"WHERE {column_name} IN (SELECT old FROM temp.uuid_map)"):
+                    uuid_bytes = value if isinstance(value, bytes) else uuid_to_bytes(value)
+                    found.setdefault(bytes_to_uuid(uuid_bytes), []).append(f"{table}.{column}")
+        finally:
+            connection.close()
+        return found
+
+
+class UUIDIndex:
+    """Persistent index of the player UUIDs found in each content file
+
+    Entries are keyed by path relative to the server root and remember the size
+    and mtime of the file when it was scanned, so a stale entry is detected with
+    a stat call instead of reading the file. UUIDs are stored hyphenated with
+    their byte offsets (in the decompressed data for compressed files). Only
+    UUIDs of known players are recorded, so the index also stores the player
+    table fingerprint and is only valid for the same players.
+    """
+
+    VERSION = 2
+
+    def __init__(self, index_path: Path, root_dir: Path):
+        self.index_path = index_path
+        self.root_dir = root_dir
+        self.players_fingerprint = ''
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    def load(self, players_fingerprint: str) -> bool:
+        """Load the index, return False if there is no usable index for this server and these players"""
+        self.players_fingerprint = players_fingerprint
+        data = load_record(self.index_path, self.VERSION, self.root_dir)
+        if data is None or data.get('players') != players_fingerprint:
+            return False
+        self.files = data['files']
+        return True
+
+    def save(self):
+        """Save the index"""
+        save_json(self.index_path, {'version': self.VERSION, 'root_dir': str(self.root_dir),
+                                    'players': self.players_fingerprint, 'files': self.files})
+
+    def get(self, file_path: Path) -> Optional[Dict[str, List[int]]]:
+        """Return the UUID occurrences of a file, or None if it is not indexed or changed since"""
+        entry = self.files.get(relative_key(self.root_dir, file_path))
+        if entry is None:
+            return None
+        try:
+            stat_result = file_path.stat()
+        except OSError:
+            return None
+        if entry['size'] != stat_result.st_size or entry['mtime_ns'] != stat_result.st_mtime_ns:
+            return None
+        return entry['uuids']
+
+    def update(self, file_path: Path, entry: Dict[str, Any]):
+        """Store a freshly scanned entry"""
+        self.files[relative_key(self.root_dir, file_path)] = entry
+
+    def rename(self, old_path: Path, new_path: Path):
+        """Move an entry along with its renamed file"""
+        entry = self.files.pop(relative_key(self.root_dir, old_path), None)
+        if entry is not None:
+            self.files[relative_key(self.root_dir, new_path)] = entry
+
+    def prune(self, dir_path: Path, file_paths: List[Path], max_depth: int = 0):
+        """Drop entries of files up to max_depth levels below dir_path that no longer exist"""
+        prefix = relative_key(self.root_dir, dir_path) + '/'
+        existing = {relative_key(self.root_dir, file_path) for file_path in file_paths}
+        for key in [key for key in self.files if key.startswith(prefix)]:
+            if key not in existing and key[len(prefix):].count('/') <= max_depth:
+                del self.files[key]
+
+
+class VerificationRecord:
+    """Content hashes and leftover source UUIDs of the files a conversion processed
+
+    Entries are keyed by path relative to the server root, like the UUID index,
+    and hold the size, mtime and SHA-256 of the file after conversion together
+    with the source UUIDs still found in it and how often. A later check only
+    reads files whose size or mtime changed, and only rescans those whose hash
+    changed too.
+    """
+
+    VERSION = 1
+
+    def __init__(self, record_path: Path, root_dir: Path):
+        self.record_path = record_path
+        self.root_dir = root_dir
+        self.mode_id = 0
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> bool:
+        """Load the record, return False if there is no record for this server"""
+        data = load_record(self.record_path, self.VERSION, self.root_dir)
+        if data is None:
+            return False
+        self.mode_id = data['mode_id']
+        self.files = data['files']
+        return True
+
+    def save(self):
+        """Save the record"""
+        save_json(self.record_path, {'version': self.VERSION, 'root_dir': str(self.root_dir),
+                                     'mode_id': self.mode_id, 'files': self.files})
+
+    def update(self, file_path: Path, scan_entry: Dict[str, Any], source_uuids: Dict[str, str]):
+        """Store the result of scanning a converted file; source_uuids are the UUIDs that were converted"""
+        entry = {
+            'size': scan_entry['size'],
+            'mtime_ns': scan_entry['mtime_ns'],
+            'sha256': scan_entry['sha256'],
+            'leftovers': {player_uuid: len(offsets) for player_uuid, offsets in scan_entry['uuids'].items()
+                          if player_uuid in source_uuids},
+        }
+        # Region files and databases are scanned again with their own reader
+        if 'kind' in scan_entry:
+            entry['kind'] = scan_entry['kind']
+        if scan_entry.get('undecoded'):
+            entry['undecoded'] = scan_entry['undecoded']
+        self.files[relative_key(self.root_dir, file_path)] = entry
+
+    def failures(self) -> Dict[str, Dict[str, int]]:
+        """Files that still hold source UUIDs, with the count of each UUID"""
+        return {key: entry['leftovers'] for key, entry in self.files.items() if entry['leftovers']}
+
+    def unchecked(self) -> Dict[str, int]:
+        """Region files with chunks that could not be decoded, with the number of such chunks"""
+        return {key: entry['undecoded'] for key, entry in self.files.items() if entry.get('undecoded')}
+
+
+class ConversionSnapshot:
+    """Snapshot of the files a conversion changes, so that it can be rolled back
+
+    A file is hard-linked into the snapshot folder before it is first rewritten,
+    and renames are recorded before they happen. Rewrites then have to replace
+    files instead of writing into them, or the links would change with them;
+    files that are patched in place (region files) are copied instead. The
+    manifest is a JSON-lines file that the converter and its worker processes
+    append to with one write per record, so it keeps the order of the changes
+    and stays usable after a crash.
+    """
+
+    VERSION = 1
+    MANIFEST_NAME = 'manifest.jsonl'
+
+    def __init__(self, snapshot_dir: Path, root_dir: Path):
+        self.snapshot_dir = snapshot_dir
+        self.root_dir = root_dir
+        self.manifest_path = snapshot_dir / self.MANIFEST_NAME
+        self._fd: Optional[int] = None
+        self._preserved = set()
+        self._ids = itertools.count()
+
+    def __getstate__(self):
+        # Worker processes open their own manifest handle
+        return self.snapshot_dir, self.root_dir
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def create(self, mode_id: int, protected: Iterable[Path] = ()):
+        """Start a new snapshot, discarding the previous one
+
+        Only a folder holding the manifest of an earlier snapshot is deleted, and
+        never one that is or contains the server root or a protected path.
+        """
+        snapshot_dir = self.snapshot_dir.resolve()
+        for path in (self.root_dir, *protected):
+            path = path.resolve()
+            if path == snapshot_dir or snapshot_dir in path.parents:
+                raise ValueError(f"Snapshot folder {self.snapshot_dir} is or contains {path}, choose another snapshot_dir")
+        if self.snapshot_dir.exists():
+            if not self.manifest_path.is_file():
+                raise ValueError(f"Snapshot folder {self.snapshot_dir} exists but holds no earlier snapshot, "
+                                 "choose another snapshot_dir")
+            shutil.rmtree(self.snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True)
+        self.open()
+        self._append({'version': self.VERSION, 'root_dir': str(self.root_dir),
+                      'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'mode_id': mode_id})
+
+    def open(self):
+        """Open the manifest for appending"""
+        self._fd = os.open(self.manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+
+    def close(self, complete: bool = False):
+        """Close the manifest, marking the snapshot complete after a finished conversion"""
+        if self._fd is None:
+            return
+        if complete:
+            self._append({'complete': True})
+        os.close(self._fd)
+        self._fd = None
+
+    def _append(self, record: Dict[str, Any]):
+        os.write(self._fd, (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+
+    def preserve(self, file_path: Path, copy: bool = False):
+        """Keep the current content of a file before it is first changed"""
+        key = relative_key(self.root_dir, file_path)
+        if key in self._preserved:
+            return
+        self._preserved.add(key)
+        name = f"{os.getpid()}-{next(self._ids)}"
+        saved_path = self.snapshot_dir / name
+        if copy:
+            shutil.copy2(file_path, saved_path)
+        else:
+            try:
+                os.link(file_path, saved_path)
+            except OSError:
+                # Another file system, or one without hard links
+                shutil.copy2(file_path, saved_path)
+        self._append({'file': key, 'saved': name})
+
+    def record_rename(self, old_path: Path, new_path: Path):
+        """Record a rename that is about to happen"""
+        old_key, new_key = relative_key(self.root_dir, old_path), relative_key(self.root_dir, new_path)
+        # Content written under either name from now on is newer than the rename
+        self._preserved.discard(old_key)
+        self._preserved.discard(new_key)
+        self._append({'rename': [old_key, new_key]})
+
+    def rollback(self) -> Tuple[int, int]:
+        """Undo the recorded changes, newest first, return (files restored, renames undone)"""
+        with open(self.manifest_path, 'r', encoding='utf-8') as file:
+            records = [json.loads(line) for line in file if line.endswith('\n')]
+        header = records[0] if records else {}
+        if header.get('version') != self.VERSION or header.get('root_dir') != str(self.root_dir):
+            raise ValueError(f"Snapshot {self.snapshot_dir} does not belong to {self.root_dir}")
+
+        restored = 0
+        undone = 0
+        for record in reversed(records[1:]):
+            if 'file' in record:
+                saved_path = self.snapshot_dir / record['saved']
+                if saved_path.exists():
+                    os.replace(saved_path, self.root_dir / record['file'])
+                    restored += 1
+            elif 'rename' in record:
+                old_path, new_path = (self.root_dir / key for key in record['rename'])
+                if new_path.exists() and not old_path.exists():
+                    new_path.rename(old_path)
+                    undone += 1
+        shutil.rmtree(self.snapshot_dir)
+        return restored, undone
+
+
+class ConversionJournal:
+    """Write-ahead journal of a conversion, so that an interrupted run can be resumed
+
+    The journal is a JSON-lines file. It starts with the direction of the
+    conversion, the renames of each folder are recorded before any of them is
+    made, and every finished rename, file rewrite and step is marked done.
+    Plans are synced to disk at once, done marks in batches: a lost mark only
+    means the operation is repeated, and repeating one converts nothing twice.
+    """
+
+    VERSION = 1
+    # Done marks written between two fsyncs
+    SYNC_INTERVAL = 256
+
+    def __init__(self, journal_path: Path, root_dir: Path):
+        self.journal_path = journal_path
+        self.root_dir = root_dir
+        self.plans: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self.done: set = set()
+        self._file = None
+        self._unsynced = 0
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Read an unfinished journal of this server, return its header or None if there is none"""
+        if not self.journal_path.exists():
+            return None
+        with open(self.journal_path, 'r', encoding='utf-8') as file:
+            # A line cut off by the interruption is ignored
+            records = [json.loads(line) for line in file if line.endswith('\n')]
+        if not records or records[-1].get('complete'):
+            return None
+        header = records[0]
+        if header.get('version') != self.VERSION or header.get('root_dir') != str(self.root_dir):
+            return None
+        for record in records[1:]:
+            if 'plan' in record:
+                self.plans[record['plan']] = [tuple(entry) for entry in record['files']]
+            elif 'done' in record:
+                self.done.add((record['done'], record['name']))
+        return header
+
+    def start(self, mode_id: int):
+        """Start a new journal"""
+        self._file = open(self.journal_path, 'w', encoding='utf-8')
+        self._write({'version': self.VERSION, 'root_dir': str(self.root_dir),
+                     'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'mode_id': mode_id})
+        self.sync()
+
+    def reopen(self):
+        """Continue the loaded journal"""
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def sync(self):
+        """Flush the journal to disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def planned(self, folder: Path) -> Optional[List[Tuple[Path, Optional[Path]]]]:
+        """Renames planned for a folder by the interrupted run, as (old path, new path or None)"""
+        plan = self.plans.get(relative_key(self.root_dir, folder))
+        if plan is None:
+            return None
+        return [(self.root_dir / old, self.root_dir / new if new else None) for old, new in plan]
+
+    def plan(self, folder: Path, renames: List[Tuple[Path, Optional[Path]]]):
+        """Record the renames of a folder before making any of them"""
+        files = [(relative_key(self.root_dir, old), relative_key(self.root_dir, new) if new else None)
+                 for old, new in renames]
+        self.plans[relative_key(self.root_dir, folder)] = files
+        self._write({'plan': relative_key(self.root_dir, folder), 'files': files})
+        self.sync()
+
+    def is_done(self, kind: str, name: Union[str, Path]) -> bool:
+        """Whether an operation was marked done"""
+        if isinstance(name, Path):
+            name = relative_key(self.root_dir, name)
+        return (kind, name) in self.done
+
+    def mark_done(self, kind: str, name: Union[str, Path]):
+        """Mark a rename ('rename'), rewrite ('content', 'region') or step ('step') done"""
+        if isinstance(name, Path):
+            name = relative_key(self.root_dir, name)
+        self.done.add((kind, name))
+        self._write({'done': kind, 'name': name})
+        self._unsynced += 1
+        if self._unsynced >= self.SYNC_INTERVAL:
+            self.sync()
+
+    def close(self, complete: bool = False):
+        """Close the journal, marking the conversion complete if it finished"""
+        if self._file is None:
+            return
+        if complete:
+            self._write({'complete': True})
+        self.sync()
+        self._file.close()
+        self._file = None
+
+
+class ProfileCache:
+    """Persistent cache of online UUIDs looked up by player name"""
+
+    # Names without an account are looked up again after this many seconds
+    MISS_TTL = 24 * 3600
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.changed = False
+
+    def load(self):
+        """Load the cache if there is one"""
+        if self.cache_path.exists():
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                self.profiles = json.load(file)
+
+    def save(self):
+        """Save the cache if it changed"""
+        if not self.changed:
+            return
+        save_json(self.cache_path, self.profiles, ensure_ascii=False)
+        self.changed = False
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the cached profile of a name ({'uuid': ... or None}), or None if it must be looked up"""
+        profile = self.profiles.get(name.lower())
+        if profile is None:
+            return None
+        if profile['uuid'] is None and time.time() - profile['time'] > self.MISS_TTL:
+            return None
+        return profile
+
+    def put(self, name: str, online_uuid: Optional[str]):
+        """Remember the online UUID of a name, or that it has no account"""
+        self.profiles[name.lower()] = {'name': name, 'uuid': online_uuid, 'time': int(time.time())}
+        self.changed = True
+
+
+class ProfileClient:
+    """Batched, rate-limited lookup of online UUIDs by player name
+
+    Speaks the Mojang bulk profile API: POST a JSON list of up to 10 names, get
+    back [{"id": ..., "name": ...}] for the names that have an account. The URL
+    can point at a mirror or a local mock server.
+    """
+
+    DEFAULT_URL = 'https://api.mojang.com/profiles/minecraft'
+    BATCH_SIZE = 10
+
+    def __init__(self, url: str = DEFAULT_URL, requests_per_second: float = 1.0,
+                 concurrency: int = 4, timeout: float = 10.0, retries: int = 3):
+        self.url = url
+        self.interval = 1.0 / requests_per_second
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self._next_slot = 0.0
+
+    def lookup(self, names: List[str]) -> Tuple[Dict[str, str], List[str], List[str]]:
+        """Resolve names, return ({lowercase name: online UUID}, names of failed batches, errors)"""
+        return asyncio.run(self._lookup_all(names))
+
+    async def _lookup_all(self, names: List[str]) -> Tuple[Dict[str, str], List[str], List[str]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self._next_slot = 0.0
+        batches = [names[i:i + self.BATCH_SIZE] for i in range(0, len(names), self.BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self._lookup_batch(batch, semaphore) for batch in batches), return_exceptions=True
+        )
+
+        found: Dict[str, str] = {}
+        failed = []
+        errors = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                failed += batch
+                errors.append(f"Profile lookup of {', '.join(batch)} failed: {result}")
+            else:
+                found.update(result)
+        return found, failed, errors
+
+    async def _wait_for_slot(self):
+        """Space requests out to the configured rate"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _lookup_batch(self, names: List[str], semaphore: asyncio.Semaphore) -> Dict[str, str]:
+        """Look up one batch of names, retrying when rate limited"""
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                await self._wait_for_slot()
+                try:
+                    profiles = await loop.run_in_executor(None, self._post, names)
+                except urllib.error.HTTPError as e:
+                    if e.code == 429 and attempt < self.retries:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    raise
+                return {
+                    profile['name'].lower(): bytes_to_uuid(uuid_to_bytes(profile['id']))
+                    for profile in profiles
+                }
+
+    def _post(self, names: List[str]) -> List[Dict[str, str]]:
+        """Send one blocking bulk profile request"""
+        request = urllib.request.Request(
+            self.url, data=json.dumps(names).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+
+class PlayerTableBuilder:
+    """Builds the player table, filling in the UUIDs that Info.json leaves out
+
+    Offline UUIDs are derived from the name. Online UUIDs come from the player
+    entry, then the usercache.json of the servers, then the profile cache and
+    finally the profile API, whose answers are added to the cache.
+    """
+
+    def __init__(self, root_dirs: List[Path], cache: ProfileCache, client: Optional[ProfileClient] = None):
+        self.root_dirs = root_dirs
+        self.cache = cache
+        self.client = client
+        # Players the usercache.json files of two servers give different online UUIDs
+        self.conflicts: List[str] = []
+
+    @staticmethod
+    def _read_usercache(usercache_path: Path) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Return {lowercase name: (name, online UUID or None)} from one usercache.json"""
+        if not usercache_path.exists():
+            return {}
+        with open(usercache_path, 'r', encoding='utf-8') as file:
+            entries = json.load(file)
+
+        seeds = {}
+        for entry in entries:
+            name, player_uuid = entry.get('name'), entry.get('uuid')
+            if not name or not player_uuid:
+                continue
+            # An offline server caches offline UUIDs, which are no use as online ones
+            if player_uuid.lower() == offline_uuid(name):
+                seeds[name.lower()] = (name, None)
+            else:
+                seeds[name.lower()] = (name, player_uuid.lower())
+        return seeds
+
+    def _merge_usercaches(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Merge the usercache.json of every server, recording players they disagree on as conflicts"""
+        seeds: Dict[str, Tuple[str, Optional[str]]] = {}
+        sources: Dict[str, Path] = {}
+        for root_dir in self.root_dirs:
+            usercache_path = root_dir / "usercache.json"
+            for key, (name, player_uuid) in self._read_usercache(usercache_path).items():
+                known = seeds.get(key)
+                if known is None or known[1] is None:
+                    if known is None or player_uuid is not None:
+                        seeds[key] = (name, player_uuid)
+                        sources[key] = usercache_path
+                elif player_uuid is not None and player_uuid != known[1]:
+                    self.conflicts.append(f"Player {name} has the online UUID {known[1]} in {sources[key]} "
+                                          f"and {player_uuid} in {usercache_path}")
+        return seeds
+
+    def build(self, entries: List[Dict[str, str]], include_usercache: bool = False) -> PlayerTable:
+        """Build the table from player entries, plus every cached player if include_usercache"""
+        seeds = self._merge_usercaches()
+        entries = list(entries)
+        if include_usercache:
+            listed = {entry['name'].lower() for entry in entries}
+            entries += [{'name': name} for key, (name, _) in seeds.items() if key not in listed]
+
+        # Resolve missing online UUIDs from the cheapest source that knows them
+        online: Dict[str, str] = {}
+        unresolved = []
+        for entry in entries:
+            key = entry['name'].lower()
+            if entry.get('Online_UUID'):
+                continue
+            if key in seeds and seeds[key][1] is not None:
+                online[key] = seeds[key][1]
+                continue
+            profile = self.cache.get(entry['name'])
+            if profile is not None:
+                if profile['uuid'] is not None:
+                    online[key] = profile['uuid']
+            else:
+                unresolved.append(entry['name'])
+
+        if unresolved and self.client is not None:
+            print(f"Looking up {len(unresolved)} player(s) at {self.client.url}")
+            found, failed, errors = self.client.lookup(unresolved)
+            for error in errors:
+                print(f"Warning: {error}")
+            # Failed lookups are not cached, so the next run tries them again
+            failed = set(failed)
+            for name in unresolved:
+                if name.lower() in found:
+                    online[name.lower()] = found[name.lower()]
+                    self.cache.put(name, found[name.lower()])
+                elif name not in failed:
+                    self.cache.put(name, None)
+            self.cache.save()
+
+        players = PlayerTable()
+        for entry in entries:
+            name = entry['name']
+            online_uuid = entry.get('Online_UUID') or online.get(name.lower())
+            if online_uuid is None:
+                print(f"Warning: Online UUID of player {name} is unknown, skipping this player")
+                continue
+            players.add(name, online_uuid, entry.get('Offline_UUID') or offline_uuid(name))
+        return players
+
+
+class PhaseMetrics:
+    """Counters of one conversion phase, or of one file while it is processed"""
+
+    COUNTERS = ('files', 'renamed', 'rewritten', 'skipped', 'bytes_read', 'bytes_written', 'replacements')
+    __slots__ = ('seconds', 'peak_memory') + COUNTERS
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.peak_memory = 0
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+
+    def add(self, other: 'PhaseMetrics'):
+        """Add the counters of another phase or file"""
+        for counter in self.COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        result = {'seconds': round(self.seconds, 6)}
+        result.update((counter, getattr(self, counter)) for counter in self.COUNTERS)
+        if self.peak_memory:
+            result['peak_memory'] = self.peak_memory
+        return result
+
+
+class PlayerFolder(NamedTuple):
+    """One changeUUID_folder_name entry"""
+    path: Path
+    change_content: bool
+    # Globs matched against paths relative to the folder; no include means all files
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    # Number of subfolder levels to descend into
+    max_depth: int = 0
+
+
+class DatabaseTarget(NamedTuple):
+    """One database_files entry"""
+    path: Path
+    # (table, column) pairs; None means UUID columns are discovered
+    columns: Optional[Tuple[Tuple[str, str], ...]] = None
+
+
+class MinecraftUUIDConverter:
+    # Log output is collected in memory and written to log.txt in large blocks
+    LOG_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, config_path: Union[str, Dict[str, Any]] = 'Info.json', workers: Optional[int] = None,
+                 verbose: Optional[bool] = None, log_json: Optional[str] = None,
+                 safe_write: Optional[bool] = None, metrics_file: Optional[str] = None,
+                 trace_memory: bool = False, snapshot: Optional[bool] = None,
+                 journal: Optional[bool] = None, players: Optional[PlayerTable] = None,
+                 shared_matchers: Optional[Dict[int, Tuple['PlayerLookup', 'UUIDMatcher']]] = None,
+                 stdout_router: Optional['ThreadRoutedStdout'] = None, verify: Optional[bool] = None,
+                 use_index: Optional[bool] = None):
+        self.config = self._load_config(config_path)
+        self.dirs = self._prepare_directories()
+        self.region_dirs = self._prepare_region_directories()
+        self.databases = self._prepare_databases()
+        self.mode_id = 0
+        self.lookup = None
+        self.matcher = None
+        self.scan_matcher = None
+        # Lookups and matchers compiled once for all servers of a fleet, by mode
+        self.shared_matchers = shared_matchers
+        # Per-phase metrics; helpers count into the metrics of the running phase
+        self.metrics: Dict[str, PhaseMetrics] = {}
+        self._io = PhaseMetrics()
+        # Hash and UUIDs of the file content the running content task wrote
+        self._content_entry: Optional[Dict[str, Any]] = None
+
+        # Worker pools, started by convert() when more than one worker is configured
+        self.workers = max(1, int(workers or self.config.get('workers', 1)))
+        self.thread_pool = None
+        self.process_pool = None
+        self.failures: List[str] = []
+
+        # Patch uncompressed files in place unless crash-safe rewrites are requested
+        self.safe_write = self.config.get('safe_write', False) if safe_write is None else safe_write
+
+        # Snapshot of changed files for --rollback; its hard links need files to be replaced, not patched
+        if snapshot is None:
+            snapshot = self.config.get('snapshot', False)
+        self.snapshot = None
+        if snapshot:
+            self.snapshot = ConversionSnapshot(self._snapshot_dir(), Path(self.config['root_dir']))
+            self.safe_write = True
+        
+        # Per-file log lines are only printed in verbose mode; summaries always are
+        self.verbose = self.config.get('verbose', True) if verbose is None else verbose
+        if log_json is None:
+            log_json = self.config.get('log_json')
+
+        # Get Python script directory for log file location
+        self.script_dir = Path(__file__).parent
+        self.log_file = self.script_dir / self.config.get('log_file', 'log.txt')
+        self.json_log_file = self.script_dir / log_json if log_json else None
+        self.metrics_file = self.config.get('metrics_file') if metrics_file is None else metrics_file
+        self.trace_memory = trace_memory
+        self.stdout_router = stdout_router
+        self._setup_logging()
+        try:
+            self.players = self._prepare_players() if players is None else players
+        except Exception:
+            self._close_logging()
+            raise
+
+        # UUID occurrence index written by scan(); convert() only uses it when asked to
+        self.index = UUIDIndex(
+            self.script_dir / self.config.get('index_file', 'uuid_index.json'),
+            Path(self.config['root_dir'])
+        )
+        self.use_index = self.config.get('use_index', False) if use_index is None else use_index
+        self.index_enabled = False
+
+        # Hashes and leftover source UUIDs of converted files, checked again by verify()
+        self.verify_enabled = self.config.get('verify', False) if verify is None else verify
+        self.verification = VerificationRecord(
+            self.script_dir / self.config.get('verify_file', 'uuid_verify.json'),
+            Path(self.config['root_dir'])
+        )
+
+        # Journal of the conversion for --resume; its writes must be atomic, so files are replaced
+        if journal is None:
+            journal = self.config.get('journal', False)
+        self.journal = None
+        if journal:
+            self.journal = ConversionJournal(
+                self.script_dir / self.config.get('journal_file', 'conversion_journal.jsonl'),
+                Path(self.config['root_dir'])
+            )
+            self.safe_write = True
+
+    def _snapshot_dir(self) -> Path:
+        """Snapshot folder; inside the server by default so files can be hard-linked"""
+        return Path(self.config['root_dir']) / self.config.get('snapshot_dir', '.uuid_snapshot')
+
+    def _setup_logging(self):
+        """Set up logging to file"""
+        # Keep one buffered handle open for the whole run
+        self._log_handle = open(self.log_file, 'w', encoding='utf-8', buffering=self.LOG_BUFFER_SIZE)
+        self._log_handle.write(f"Minecraft Online/Offline UUID Converter (with online-mode switching)Log\n")
+        self._log_handle.write(f"============================\n")
+        self._log_handle.write(f"Log file location: {self.log_file}\n")
+        self._log_handle.write(f"Run time: {self._get_current_time()}\n\n")
+
+        # Optional machine-readable log, one JSON object per line
+        self._json_log_handle = None
+        if self.json_log_file is not None:
+            self._json_log_handle = open(
+                self.json_log_file, 'w', encoding='utf-8', buffering=self.LOG_BUFFER_SIZE
+            )
+        
+        # Redirect stdout to file and console; in a fleet run stdout is routed per server thread
+        if self.stdout_router is not None:
+            self.original_stdout = self.stdout_router.console_for(self.config.get('name', Path(self.config['root_dir']).name))
+            self.stdout_router.register(self)
+        else:
+            self.original_stdout = sys.stdout
+            sys.stdout = self
+
+    def _close_logging(self):
+        """Restore stdout and close log files"""
+        if self.stdout_router is not None:
+            self.original_stdout.flush()
+            self.stdout_router.unregister()
+        else:
+            sys.stdout = self.original_stdout
+        self._log_handle.close()
+        if self._json_log_handle is not None:
+            self._json_log_handle.close()
+
+    def _get_current_time(self):
+        """Get current time string"""
+        from datetime import datetime
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def write(self, text):
+        """Override write method to output to both file and console"""
+        self._log_handle.write(text)
+        self.original_stdout.write(text)
+
+    def flush(self):
+        """Override flush method"""
+        self.original_stdout.flush()
+        self._log_handle.flush()
+
+    def _log_event(self, event: str, message: Optional[str] = None, **fields):
+        """Log a per-file event: printed in verbose mode, always written to the JSON log"""
+        if message and self.verbose:
+            print(message)
+        if self._json_log_handle is not None:
+            record = {'time': round(time.time(), 3), 'event': event}
+            record.update(fields)
+            if message:
+                record['message'] = message
+            self._json_log_handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _log_error(self, error: str, **fields):
+        """Log a failure; errors are always printed and collected for the final report"""
+        print(error)
+        self.failures.append(error)
+        self._log_event('error', None, error=error, **fields)
+
+    @contextlib.contextmanager
+    def _phase(self, name: str) -> Iterator[PhaseMetrics]:
+        """Time a phase; file counters of helpers called inside it go to its metrics"""
+        metrics = self.metrics.setdefault(name, PhaseMetrics())
+        previous_io, self._io = self._io, metrics
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            metrics.seconds += time.perf_counter() - start
+            if self.trace_memory:
+                metrics.peak_memory = max(metrics.peak_memory, tracemalloc.get_traced_memory()[1])
+            self._io = previous_io
+
+    def _metrics_report(self, total_seconds: float) -> Dict[str, Any]:
+        """Metrics of the run as saved in the JSON report"""
+        return {
+            'mode': 'online->offline' if self.mode_id == 1 else 'offline->online',
+            'workers': self.workers,
+            'total_seconds': round(total_seconds, 6),
+            'phases': {name: metrics.as_dict() for name, metrics in self.metrics.items()},
+            'errors': len(self.failures),
+        }
+
+    def _report_metrics(self, total_seconds: float):
+        """Print the per-phase summary table and save the JSON metrics report"""
+        columns = ('seconds',) + PhaseMetrics.COUNTERS + (('peak_memory',) if self.trace_memory else ())
+        report = self._metrics_report(total_seconds)
+        rows = list(report['phases'].items())
+        widths = [max(len(column), 8) + 2 for column in columns]
+        print("\nPhase summary:")
+        print(f"  {'phase':<18}" + ''.join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+        for name, values in rows:
+            cells = ''.join(
+                f"{values.get(column, 0):>{width}.3f}" if column == 'seconds' else f"{values.get(column, 0):>{width}}"
+                for column, width in zip(columns, widths)
+            )
+            print(f"  {name:<18}{cells}")
+        print(f"  {'total':<18}{total_seconds:>{widths[0]}.3f}")
+
+        self._log_event('metrics', **report)
+        if self.metrics_file:
+            with open(self.script_dir / self.metrics_file, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=4)
+            print(f"Metrics report saved to: {self.script_dir / self.metrics_file}")
+
+    def _load_config(self, config_path: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Load configuration file, or use a configuration that is already loaded"""
+        if isinstance(config_path, dict):
+            return config_path
+        with open(config_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _prepare_players(self) -> PlayerTable:
+        """Prepare player information, deriving or looking up UUIDs that are not given"""
+        return self.prepare_players(self.config, self.script_dir, [Path(self.config['root_dir'])])
+
+    @staticmethod
+    def prepare_players(config: Dict[str, Any], script_dir: Path, root_dirs: List[Path]) -> PlayerTable:
+        """Prepare the players of the servers in root_dirs, whose usercache.json files are merged"""
+        client = None
+        if config.get('profile_lookup', False):
+            client = ProfileClient(
+                config.get('profile_api', ProfileClient.DEFAULT_URL),
+                requests_per_second=config.get('profile_requests_per_second', 1.0)
+            )
+        cache = ProfileCache(script_dir / config.get('profile_cache', 'profile_cache.json'))
+        cache.load()
+        builder = PlayerTableBuilder(root_dirs, cache, client)
+        players = builder.build(config.get('player', []), config.get('include_usercache_players', False))
+
+        # Large player lists live in an external table next to Info.json
+        table_name = config.get('player_table')
+        if table_name:
+            table_path = script_dir / table_name
+            if table_path.suffix.lower() in ('.db', '.sqlite', '.sqlite3'):
+                query = config.get('player_table_query', 'SELECT name, online_uuid, offline_uuid FROM players')
+                players.extend(PlayerTable.from_sqlite(table_path, query))
+            else:
+                players.extend(PlayerTable.from_csv(table_path))
+            print(f"Loaded player table: {table_path}")
+
+        # Stop before converting anything if the players are ambiguous
+        conflicts, duplicates = players.validate()
+        conflicts = builder.conflicts + conflicts
+        for duplicate in duplicates:
+            print(f"Warning: {duplicate}")
+        if conflicts:
+            shown = conflicts[:10]
+            if len(conflicts) > len(shown):
+                shown.append(f"... and {len(conflicts) - len(shown)} more")
+            raise ValueError("Conflicting players:\n  " + "\n  ".join(shown))
+        print(f"Players: {len(players)}")
+        return players
+
+    def _prepare_lookup(self):
+        """Build lookup tables and UUID matcher once the mode is known"""
+        if self.mode_id and self.shared_matchers and self.mode_id in self.shared_matchers:
+            self.lookup, self.matcher = self.shared_matchers[self.mode_id]
+        elif self.mode_id:
+            self.lookup = self.players.lookup(self.mode_id)
+            self.matcher = UUIDMatcher(self.lookup.by_uuid)
+        if self.index_enabled or self.verify_enabled:
+            # The index records UUIDs of both modes, so it stays valid after converting
+            known_uuids = {}
+            for name, online_uuid, offline_uuid in self.players:
+                for player_uuid in (online_uuid, offline_uuid):
+                    known_uuids[player_uuid] = player_uuid
+                    known_uuids[player_uuid.replace('-', '')] = player_uuid.replace('-', '')
+            self.scan_matcher = UUIDMatcher(known_uuids, keep_identity=True)
+
+    def _prepare_directories(self) -> List[PlayerFolder]:
+        """Prepare directory information"""
+        return [
+            PlayerFolder(
+                Path(self.config['root_dir']) / folder['name'],
+                folder['change_content'],
+                tuple(folder.get('include', ())),
+                tuple(folder.get('exclude', ())),
+                int(folder.get('max_depth', 0))
+            )
+            for folder in self.config['changeUUID_folder_name']
+        ]
+
+    def _prepare_region_directories(self) -> List[Path]:
+        """Prepare region (.mca) directory information"""
+        return [
+            Path(self.config['root_dir']) / folder
+            for folder in self.config.get('region_folder_name', [])
+        ]
+
+    def _prepare_databases(self) -> List[DatabaseTarget]:
+        """Prepare SQLite database information"""
+        databases = []
+        for entry in self.config.get('database_files', []):
+            if isinstance(entry, str):
+                entry = {'path': entry}
+            columns = entry.get('columns')
+            databases.append(DatabaseTarget(
+                Path(self.config['root_dir']) / entry['path'],
+                tuple((table, column) for table, column in columns) if columns is not None else None
+            ))
+        return databases
+
+    def _determine_mode_from_server_properties(self) -> int:
+        """Determine current mode from server.properties file"""
+        server_properties_path = Path(self.config['root_dir']) / "server.properties"
+        
+        if not server_properties_path.exists():
+            raise FileNotFoundError(f"server.properties file not found: {server_properties_path}")
+        
+        with open(server_properties_path, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+        
+        online_mode_line = None
+        for line in lines:
+            if line.strip().startswith('online-mode='):
+                online_mode_line = line.strip()
+                break
+        
+        if online_mode_line is None:
+            raise ValueError("online-mode setting not found in server.properties")
+        
+        # Parse online-mode value
+        if '=' in online_mode_line:
+            value = online_mode_line.split('=', 1)[1].strip().lower()
+            if value == 'true':
+                print("Current mode: Online (online-mode=true)")
+                return 1  # Online -> Offline
+            elif value == 'false':
+                print("Current mode: Offline (online-mode=false)")
+                return 2  # Offline -> Online
+            else:
+                raise ValueError(f"Invalid online-mode value: {value}")
+        else:
+            raise ValueError("Invalid online-mode line format")
+
+    def _update_server_properties(self):
+        """Update online-mode setting in server.properties"""
+        with self._phase('server_properties'):
+            self._write_server_properties()
+
+    def _write_server_properties(self):
+        """Switch the online-mode line of server.properties"""
+        server_properties_path = Path(self.config['root_dir']) / "server.properties"
+        
+        if not server_properties_path.exists():
+            print(f"Warning: server.properties file not found: {server_properties_path}")
+            return
+        
+        with open(server_properties_path, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+        self._io.files += 1
+        self._io.bytes_read += sum(len(line) for line in lines)
+        
+        updated = False
+        for i, line in enumerate(lines):
+            if line.strip().startswith('online-mode='):
+                if self.mode_id == 1:  # Online -> Offline, need to change to false
+                    new_value = 'false'
+                    print("Changing online-mode to: false")
+                else:  # Offline -> Online, need to change to true
+                    new_value = 'true'
+                    print("Changing online-mode to: true")
+                
+                lines[i] = f"online-mode={new_value}\n"
+                updated = True
+                break
+        
+        if updated:
+            # Same line endings as a text-mode write
+            self._write_file(server_properties_path, ''.join(lines).replace('\n', os.linesep).encode('utf-8'))
+            self._io.rewritten += 1
+            self._io.replacements += 1
+            print("Updated server.properties file")
+        else:
+            print("Warning: online-mode setting not found, server.properties not updated")
+
+    # "uuid" values of player list entries, and UUID keys of usernamecache.json
+    _UUID_VALUE_PATTERN = re.compile(r'("uuid"\s*:\s*")([0-9a-fA-F-]{36})(")')
+    _UUID_KEY_PATTERN = re.compile(r'(")([0-9a-fA-F-]{36})("\s*:)')
+
+    def _update_json_file(self, file_path: Path, update_callback: Callable, uuid_pattern: re.Pattern):
+        """Generic JSON file update method
+
+        update_callback updates the parsed data and returns {old UUID: new UUID}.
+        The file is only written if something changed, and then by swapping the
+        UUIDs matched by uuid_pattern in the original text, which keeps its
+        formatting. Should that not give the updated data, the file is dumped anew.
+        """
+        if not file_path.exists():
+            print(f"Warning: File {file_path} does not exist")
+            return
+
+        with open(file_path, 'rb') as file:
+            raw = file.read()
+        self._io.files += 1
+        self._io.bytes_read += len(raw)
+        text = raw.decode('utf-8')
+        data = json.loads(text)
+
+        changes = update_callback(data)
+        if not changes:
+            return
+
+        replaced = 0
+
+        def replace(match):
+            nonlocal replaced
+            target_uuid = changes.get(match.group(2))
+            if target_uuid is None:
+                return match.group()
+            replaced += 1
+            return match.group(1) + target_uuid + match.group(3)
+
+        new_text = uuid_pattern.sub(replace, text)
+        if json.loads(new_text) != data:
+            # Ambiguous entries (e.g. one UUID listed under two names), rewrite the whole file
+            new_text = json.dumps(data, indent=4, ensure_ascii=False)
+            replaced = len(changes)
+
+        self._write_file(file_path, new_text.encode('utf-8'))
+        self._io.rewritten += 1
+        self._io.replacements += replaced
+
+    def _update_uuid_in_list(self, data: List[Dict]) -> Dict[str, str]:
+        """Update UUIDs in list data, return {old UUID: new UUID} of changed entries"""
+        changes = {}
+        for item in data:
+            target_uuid = self.lookup.by_name.get(item.get('name'))
+            if target_uuid is not None and item.get('uuid') != target_uuid:
+                if isinstance(item.get('uuid'), str):
+                    changes[item['uuid']] = target_uuid
+                item['uuid'] = target_uuid
+        return changes
+
+    def _update_player_list_file(self, file_name: str, phase: str):
+        """Update a server file listing players by name and UUID"""
+        with self._phase(phase):
+            self._update_json_file(
+                Path(self.config['root_dir']) / file_name,
+                self._update_uuid_in_list,
+                self._UUID_VALUE_PATTERN
+            )
+
+    def _update_usercache(self):
+        """Update usercache.json"""
+        self._update_player_list_file("usercache.json", 'usercache')
+
+    def _update_ops(self):
+        """Update ops.json"""
+        self._update_player_list_file("ops.json", 'ops')
+
+    def _update_whitelist(self):
+        """Update whitelist.json"""
+        self._update_player_list_file("whitelist.json", 'whitelist')
+
+    def _update_banned_players(self):
+        """Update banned-players.json"""
+        self._update_player_list_file("banned-players.json", 'banned_players')
+
+    def _update_usernamecache(self):
+        """Update usernamecache.json"""
+        usernamecache_path = Path(self.config['root_dir']) / "usernamecache.json"
+        
+        def update_data(data: Dict) -> Dict[str, str]:
+            changes = {}
+            for old_uuid, username in list(data.items()):
+                new_uuid = self.lookup.by_name.get(username)
+                if new_uuid is not None and old_uuid != new_uuid:
+                    data[new_uuid] = data.pop(old_uuid)
+                    changes[old_uuid] = new_uuid
+            return changes
+        
+        with self._phase('usernamecache'):
+            self._update_json_file(usernamecache_path, update_data, self._UUID_KEY_PATTERN)
+
+    def _update_file_content(self, file_path: Path) -> Optional[str]:
+        """Update UUIDs in file content, return log message if the file changed"""
+        if not file_path.exists():
+            return None
+        
+        file_extension = file_path.suffix.lower()
+        
+        if file_extension in NBT_EXTENSIONS:
+            return self._update_nbt_file_content(file_path)
+        # Compressed content would only be searched in compressed form, so unpack it first
+        compression = self._file_compression(file_path)
+        if compression is not None:
+            return self._update_nbt_file_content(file_path, compression)
+        if file_extension == '.json':
+            return self._update_json_file_content(file_path)
+        elif file_extension == '.snbt':
+            return self._update_snbt_file_content(file_path)
+        else:
+            return self._update_binary_file_content(file_path)
+
+    def _update_json_file_content(self, file_path: Path) -> Optional[str]:
+        """Update UUIDs in JSON file content"""
+        try:
+            if self._replace_uuids_in_file(file_path):
+                return f"Updated JSON file content: {file_path.name}"
+            return None
+                
+        except Exception as e:
+            raise RuntimeError(f"Error updating JSON file content {file_path}: {e}") from e
+
+    def _update_snbt_file_content(self, file_path: Path) -> Optional[str]:
+        """Update UUIDs in SNBT file content"""
+        try:
+            # UUIDs in SNBT files may be quoted or bare, with or without hyphens;
+            # the matcher rewrites them all in place
+            if self._replace_uuids_in_file(file_path):
+                return f"Updated SNBT file content: {file_path.name}"
+            return None
+                
+        except Exception as e:
+            raise RuntimeError(f"Error updating SNBT file content {file_path}: {e}") from e
+
+    def _update_nbt_file_content(self, file_path: Path, compression: Optional[str] = None) -> Optional[str]:
+        """Update UUIDs in NBT or compressed file content, recompressing it with its original settings"""
+        try:
+            if compression is None:
+                compression = self._file_compression(file_path)
+            # Hash of the file as read, kept for the index or verification record
+            raw_digest = hashlib.sha256()
+            if compression is not None:
+                with open(file_path, 'rb') as file:
+                    chunks = iter(lambda: file.read(COMPRESSED_CHUNK_SIZE), b'')
+                    try:
+                        header, content_bytes, level = decompress_chunks(
+                            (raw_digest.update(chunk) or chunk for chunk in chunks), compression)
+                    except ValueError:
+                        # Magic bytes by chance, treat the file as uncompressed
+                        compression = None
+            if compression is not None:
+                self._io.bytes_read += file_path.stat().st_size
+            else:
+                with open(file_path, 'rb') as file:
+                    head = file.read(NBT_SNIFF_SIZE)
+                if not sniff_nbt(head):
+                    # Not NBT, only text UUIDs can be replaced
+                    return self._update_binary_file_content(file_path)
+                if file_path.stat().st_size > STREAM_CHUNK_SIZE:
+                    # Patched through a memory map instead of being read whole
+                    return self._update_binary_file_content(file_path, nbt=True)
+                with open(file_path, 'rb') as file:
+                    content_bytes = file.read()
+                self._io.bytes_read += len(content_bytes)
+                raw_digest = hashlib.sha256(content_bytes)
+            nbt = compression is not None or file_path.suffix.lower() in NBT_EXTENSIONS
+            if not self._prefilter(content_bytes, binary=True):
+                self._record_content(content_bytes, nbt, raw_digest.hexdigest(), skipped=True)
+                return None
+
+            # Binary UUIDs (int arrays and long pairs) are found by walking the tags
+            content_bytes = bytearray(content_bytes)
+            try:
+                replaced = NBTUUIDPatcher(self.matcher.binary_map).patch(content_bytes)
+                kind = 'NBT'
+            except ValueError:
+                if compression is None:
+                    # Not NBT after all, fall back to plain byte replacement
+                    return self._update_binary_file_content(file_path)
+                replaced = 0
+                kind = compression
+
+            # String UUIDs have the same length in both modes, so tag lengths stay valid
+            content_bytes, string_replaced = self.matcher.sub(bytes(content_bytes))
+            replaced += string_replaced
+
+            # Write file if content changed
+            if not replaced:
+                self._record_content(content_bytes, nbt, raw_digest.hexdigest())
+                return None
+            file_bytes = content_bytes
+            if compression is not None:
+                file_bytes = compress_payload(compression, header, content_bytes, level)
+            self._write_file(file_path, file_bytes)
+            self._record_content(content_bytes, nbt, hashlib.sha256(file_bytes).hexdigest())
+            self._io.replacements += replaced
+            return f"Updated {kind} file content: {file_path.name} ({replaced} UUIDs)"
+
+        except Exception as e:
+            raise RuntimeError(f"Error updating NBT file content {file_path}: {e}") from e
+
+    @staticmethod
+    def _file_compression(file_path: Path) -> Optional[str]:
+        """Sniff whether a file is gzip or zlib compressed"""
+        with open(file_path, 'rb') as file:
+            return sniff_compression(file.read(2))
+
+    def _update_binary_file_content(self, file_path: Path, nbt: bool = False) -> Optional[str]:
+        """Update UUIDs in binary file content (like .dat files); with nbt, binary UUIDs in its tags too"""
+        try:
+            replaced = self._replace_uuids_in_file(file_path, nbt)
+            if replaced and nbt:
+                return f"Updated NBT file content: {file_path.name} ({replaced} UUIDs)"
+            if replaced:
+                return f"Updated binary file content: {file_path.name}"
+            return None
+                
+        except Exception as e:
+            raise RuntimeError(f"Error updating binary file content {file_path}: {e}") from e
+
+    def _replace_uuids_in_file(self, file_path: Path, nbt: bool = False) -> int:
+        """Replace mapped UUIDs in an uncompressed file, return the number replaced
+
+        UUIDs keep their length in both modes, so by default the file is memory-mapped
+        and only the changed bytes are overwritten. With safe_write the new content is
+        written to a temporary file that replaces the original once complete. With
+        nbt, binary UUIDs are patched by walking the tags of the memory-mapped file.
+        """
+        if not self.safe_write:
+            return self._patch_file_in_place(file_path, nbt)
+        if nbt:
+            return self._patch_nbt_copy(file_path)
+        if file_path.stat().st_size > STREAM_CHUNK_SIZE:
+            return self._stream_replace_uuids(file_path)
+
+        with open(file_path, 'rb') as file:
+            content_bytes = file.read()
+        self._io.bytes_read += len(content_bytes)
+        if not self._prefilter(content_bytes):
+            self._record_content(content_bytes, skipped=True)
+            return 0
+        content_bytes, replaced = self.matcher.sub(content_bytes)
+        if replaced:
+            self._write_file(file_path, content_bytes)
+            self._io.replacements += replaced
+        self._record_content(content_bytes)
+        return replaced
+
+    def _stream_replace_uuids(self, file_path: Path) -> int:
+        """Replace mapped UUIDs of a large file chunk by chunk, return the number replaced
+
+        Only one chunk and the few bytes carried over from the previous one are
+        held in memory. Unchanged bytes are copied through a second handle to a
+        temporary file, which is only written once a UUID has been found. The
+        written content is hashed and searched on the way for the index or
+        verification record.
+        """
+        size = file_path.stat().st_size
+        self._io.bytes_read += size
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            chunks = (digest.update(chunk) or chunk for chunk in iter(lambda: file.read(STREAM_CHUNK_SIZE), b''))
+            if next(self.matcher.find_chunks(chunks), None) is None:
+                if self.index_enabled:
+                    # The index lists the UUIDs of both modes, which this pass did not look for
+                    entry = self._scan_large_file(file_path, file_path.stat())
+                    self._content_entry = {'sha256': entry['sha256'], 'uuids': entry['uuids']}
+                elif self.verify_enabled:
+                    self._content_entry = {'sha256': digest.hexdigest(), 'uuids': {}}
+                return 0
+
+        if self.snapshot is not None:
+            self.snapshot.preserve(file_path)
+        replaced = 0
+        digest = hashlib.sha256()
+        with replacing_file(file_path) as output:
+            with open(file_path, 'rb') as file, open(file_path, 'rb') as source:
+                def pieces() -> Iterator[bytes]:
+                    nonlocal replaced
+                    position = 0
+                    for offset, candidate in self.matcher.find_chunks(iter(lambda: file.read(STREAM_CHUNK_SIZE), b'')):
+                        # Copy the bytes up to the UUID, then write its replacement in its place
+                        while position < offset:
+                            data = source.read(min(offset - position, STREAM_CHUNK_SIZE))
+                            yield data
+                            position += len(data)
+                        yield self.matcher.bytes_map[candidate]
+                        source.seek(len(candidate), os.SEEK_CUR)
+                        position += len(candidate)
+                        replaced += 1
+                    yield from iter(lambda: source.read(STREAM_CHUNK_SIZE), b'')
+
+                def written() -> Iterator[bytes]:
+                    for piece in pieces():
+                        output.write(piece)
+                        digest.update(piece)
+                        yield piece
+
+                if self.index_enabled or self.verify_enabled:
+                    uuids = self._uuid_offsets(self.scan_matcher.find_chunks(written()))
+                    self._content_entry = {'sha256': digest.hexdigest(), 'uuids': uuids}
+                else:
+                    for _ in written():
+                        pass
+        self._io.bytes_written += size
+        self._io.replacements += replaced
+        return replaced
+
+    def _patch_file_in_place(self, file_path: Path, nbt: bool = False) -> int:
+        """Overwrite mapped UUIDs of a memory-mapped file, return the number replaced"""
+        with open(file_path, 'r+b') as file:
+            size = os.fstat(file.fileno()).st_size
+            self._io.bytes_read += size
+            if size == 0:
+                self._record_content(b'', skipped=True)
+                return 0
+            with mmap.mmap(file.fileno(), 0) as view:
+                if not self._prefilter(view, binary=nbt):
+                    self._record_content(view, nbt, skipped=True)
+                    return 0
+                replaced, patched = self._patch_view(view, nbt)
+                if replaced:
+                    view.flush()
+                    self._io.bytes_written += patched
+                self._record_content(view, nbt)
+        return replaced
+
+    def _patch_nbt_copy(self, file_path: Path) -> int:
+        """Patch a large uncompressed NBT file in a memory-mapped temporary copy, return the number replaced
+
+        The original is searched through a read-only memory map first, so a file
+        without mapped UUIDs is neither copied nor loaded into memory.
+        """
+        size = file_path.stat().st_size
+        self._io.bytes_read += size
+        with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            found = self._prefilter(view, binary=True)
+            if found:
+                try:
+                    found = bool(NBTUUIDPatcher(self.matcher.binary_map).find(view))
+                except ValueError:
+                    found = False
+                found = found or self.matcher.contains(view)
+            if not found:
+                self._record_content(view, True, skipped=True)
+                return 0
+
+        if self.snapshot is not None:
+            self.snapshot.preserve(file_path)
+        with replacing_file(file_path) as output:
+            with open(file_path, 'rb') as file:
+                shutil.copyfileobj(file, output, STREAM_CHUNK_SIZE)
+            output.flush()
+            with open(output.name, 'r+b') as copy, mmap.mmap(copy.fileno(), 0) as view:
+                replaced, _ = self._patch_view(view, True)
+                view.flush()
+                self._record_content(view, True)
+        self._io.bytes_written += size
+        return replaced
+
+    def _patch_view(self, view: mmap.mmap, nbt: bool) -> Tuple[int, int]:
+        """Overwrite mapped UUIDs in a memory map, binary NBT UUIDs first with nbt
+
+        Return the number of UUIDs replaced and of bytes overwritten.
+        """
+        binary_replaced = 0
+        if nbt:
+            try:
+                binary_replaced = NBTUUIDPatcher(self.matcher.binary_map).patch(view)
+            except ValueError:
+                # Not NBT after all, only text UUIDs are replaced
+                pass
+        # Locate everything first so the scan never sees its own writes
+        patches = list(self.matcher.find(view))
+        for offset, candidate in patches:
+            view[offset:offset + len(candidate)] = self.matcher.bytes_map[candidate]
+        replaced = binary_replaced + len(patches)
+        self._io.replacements += replaced
+        return replaced, 16 * binary_replaced + sum(len(candidate) for _, candidate in patches)
+
+    def _record_content(self, content: Union[bytes, mmap.mmap], nbt: bool = False,
+                        sha256: Optional[str] = None, skipped: bool = False):
+        """Keep the hash and UUIDs of a file's new content for the index or verification record
+
+        The content is what the rewrite already holds, so the file is not read
+        again; sha256 is given when the file holds it compressed. A file the
+        prefilter ruled out holds no source UUID, so it is only searched when
+        the index needs the UUIDs of both modes.
+        """
+        if not (self.index_enabled or self.verify_enabled):
+            return
+        if sha256 is None:
+            sha256 = hashlib.sha256(content).hexdigest()
+        uuids = self._known_uuids(content, nbt) if self.index_enabled or not skipped else {}
+        self._content_entry = {'sha256': sha256, 'uuids': uuids}
+
+    def _prefilter(self, content: Union[bytes, mmap.mmap], binary: bool = False) -> bool:
+        """Check content with the matcher prefilter, counting files it rules out"""
+        if self.matcher.may_contain(content, binary):
+            return True
+        self._io.skipped += 1
+        return False
+
+    def _write_file(self, file_path: Path, content_bytes: bytes):
+        """Write new file content, through a temporary file when safe_write is set"""
+        if self.snapshot is not None:
+            self.snapshot.preserve(file_path)
+        self._io.bytes_written += len(content_bytes)
+        if not self.safe_write:
+            with open(file_path, 'wb') as file:
+                file.write(content_bytes)
+            return
+        with replacing_file(file_path) as file:
+            file.write(content_bytes)
+
+    def _content_task(self, file_path: Path) -> Tuple[Optional[str], Optional[str], Optional[Dict], PhaseMetrics]:
+        """Update content of one file, return (log message, error message, index entry, file metrics)"""
+        previous_io, self._io = self._io, PhaseMetrics()
+        self._content_entry = None
+        try:
+            message = self._update_file_content(file_path)
+            index_entry = None
+            if self._content_entry is not None:
+                # Hashed and searched by the rewrite; only the new size and mtime are missing
+                stat_result = file_path.stat()
+                index_entry = {'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns,
+                               **self._content_entry}
+            elif self.index_enabled or self.verify_enabled:
+                index_entry = self._scan_file_content(file_path)
+            return message, None, index_entry, self._io
+        except Exception as e:
+            return None, str(e), None, self._io
+        finally:
+            self._io = previous_io
+
+    def _scan_file_content(self, file_path: Path) -> Dict[str, Any]:
+        """Find every known player UUID in a file, return its index entry"""
+        stat_result = file_path.stat()
+        if (stat_result.st_size > STREAM_CHUNK_SIZE and file_path.suffix.lower() not in NBT_EXTENSIONS
+                and self._file_compression(file_path) is None):
+            return self._scan_large_file(file_path, stat_result)
+        with open(file_path, 'rb') as file:
+            content_bytes = file.read()
+        sha256 = hashlib.sha256(content_bytes).hexdigest()
+
+        compression = sniff_compression(content_bytes[:2])
+        if compression is not None:
+            try:
+                _, content_bytes, _ = decompress_chunks([content_bytes], compression)
+            except ValueError:
+                compression = None
+        nbt = compression is not None or file_path.suffix.lower() in NBT_EXTENSIONS
+        return {'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns, 'sha256': sha256,
+                'uuids': self._known_uuids(content_bytes, nbt)}
+
+    def _known_uuids(self, content: Union[bytes, mmap.mmap], nbt: bool = False) -> Dict[str, List[int]]:
+        """Offsets of every known player UUID in content; with nbt, binary UUIDs are found by walking the tags"""
+        uuids: Dict[str, List[int]] = {}
+        if nbt:
+            try:
+                patcher = NBTUUIDPatcher(self.scan_matcher.binary_map)
+                for offset, uuid_bytes in patcher.find(content):
+                    uuids.setdefault(bytes_to_uuid(uuid_bytes), []).append(offset)
+            except ValueError:
+                pass
+        for player_uuid, offsets in self._uuid_offsets(self.scan_matcher.find(content)).items():
+            uuids.setdefault(player_uuid, []).extend(offsets)
+        return uuids
+
+    @staticmethod
+    def _uuid_offsets(hits: Iterable[Tuple[int, bytes]]) -> Dict[str, List[int]]:
+        """Group (offset, UUID text) hits by hyphenated UUID"""
+        uuids: Dict[str, List[int]] = {}
+        for offset, candidate in hits:
+            uuids.setdefault(bytes_to_uuid(uuid_to_bytes(candidate.decode('ascii'))), []).append(offset)
+        return uuids
+
+    def _scan_large_file(self, file_path: Path, stat_result: os.stat_result) -> Dict[str, Any]:
+        """Index entry of a large uncompressed file, hashed and searched chunk by chunk"""
+        digest = hashlib.sha256()
+
+        def chunks():
+            for chunk in iter(lambda: file.read(STREAM_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                yield chunk
+
+        with open(file_path, 'rb') as file:
+            uuids = self._uuid_offsets(self.scan_matcher.find_chunks(chunks()))
+        return {'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns,
+                'sha256': digest.hexdigest(), 'uuids': uuids}
+
+    def _scan_task(self, file_path: Path) -> Tuple[Optional[Dict], Optional[str]]:
+        """Scan one file, return (index entry, error message)"""
+        try:
+            return self._scan_file_content(file_path), None
+        except Exception as e:
+            return None, f"Error scanning {file_path}: {e}"
+
+    def _skip_indexed_files(self, file_paths: List[Path]) -> List[Path]:
+        """Drop files that the index shows hold no UUID to convert"""
+        remaining = []
+        for file_path in file_paths:
+            uuids = self.index.get(file_path)
+            if uuids is None or any(player_uuid in self.lookup.by_uuid for player_uuid in uuids):
+                remaining.append(file_path)
+        skipped = len(file_paths) - len(remaining)
+        if skipped:
+            print(f"Skipped {skipped} file(s) without player UUIDs according to the UUID index")
+        return remaining
+
+    # Server files that list players by UUID, checked along with the content files
+    SERVER_PLAYER_FILES = ('usercache.json', 'usernamecache.json', 'ops.json', 'whitelist.json', 'banned-players.json')
+
+    def _record_server_files(self):
+        """Add the converted server player lists to the verification record"""
+        for file_name in self.SERVER_PLAYER_FILES:
+            file_path = Path(self.config['root_dir']) / file_name
+            if file_path.exists():
+                self.verification.update(file_path, self._scan_file_content(file_path), self.lookup.by_uuid)
+
+    def _stale_player_names(self) -> List[str]:
+        """Player data files still named after a source UUID"""
+        stale = []
+        for folder in self.dirs:
+            if not folder.path.is_dir():
+                continue
+            for file_path, match in self._walk_player_files(folder):
+                target_path = self._rename_target(file_path, match)
+                if target_path is not None and target_path != file_path:
+                    stale.append(relative_key(self.verification.root_dir, file_path))
+        return stale
+
+    def _report_verification(self, stale_names: List[str]) -> bool:
+        """Print the pass/fail verification report, return whether it passed"""
+        failures = self.verification.failures()
+        unchecked = self.verification.unchecked()
+        passed = not failures and not stale_names and not unchecked
+        print(f"\nVerification {'PASSED' if passed else 'FAILED'}: {len(self.verification.files)} file(s) checked, "
+              f"{len(failures)} with source UUIDs left, {len(stale_names)} player file(s) not renamed, "
+              f"{len(unchecked)} region file(s) with chunks that could not be checked")
+        for key, leftovers in sorted(failures.items()):
+            counts = ', '.join(f"{player_uuid} x{count}" for player_uuid, count in sorted(leftovers.items()))
+            print(f"  Source UUIDs left in {key}: {counts}")
+        for key in stale_names:
+            print(f"  Player file not renamed: {key}")
+        for key, count in sorted(unchecked.items()):
+            print(f"  Chunks with LZ4 or custom compression in {key}: {count}")
+        self._log_event('verification', passed=passed, files=len(self.verification.files),
+                        leftovers=len(failures), stale_names=len(stale_names), unchecked=len(unchecked))
+        return passed
+
+    @staticmethod
+    def _file_sha256(file_path: Path) -> str:
+        """SHA-256 of a file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(COMPRESSED_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _update_region_file(self, file_path: Path) -> Tuple[Optional[str], Optional[str], Optional[Dict]]:
+        """Update UUIDs in entity and block entity NBT of a region file
+
+        Return (log message, warning, verification entry); the entry is only
+        built when verification is enabled.
+        """
+        try:
+            before_write = None
+            if self.snapshot is not None:
+                # Region files patched in place need a copy; replaced ones keep their old inode
+                before_write = functools.partial(self.snapshot.preserve, copy=not self.safe_write)
+            scan = functools.partial(self._known_uuids, nbt=True) if self.verify_enabled else None
+            patcher = AnvilRegionPatcher(self.matcher, before_write, self.safe_write, scan)
+            scanned, changed, replaced, undecoded = patcher.patch_file(file_path)
+            self._io.bytes_read += file_path.stat().st_size
+            self._io.bytes_written += patcher.bytes_written
+            self._io.replacements += replaced
+            message = None
+            warning = None
+            if changed:
+                message = (f"Updated region file: {file_path.name} "
+                           f"({changed} of {scanned} chunks, {replaced} UUIDs)")
+            if undecoded:
+                warning = (f"{undecoded} of {scanned} chunks in {file_path} use LZ4 or custom compression "
+                           "and were not converted")
+            entry = None
+            if scan is not None:
+                entry = self._region_entry(file_path, patcher, undecoded)
+            return message, warning, entry
+        except Exception as e:
+            raise RuntimeError(f"Error updating region file {file_path}: {e}") from e
+
+    @staticmethod
+    def _region_entry(file_path: Path, patcher: AnvilRegionPatcher, undecoded: int) -> Dict[str, Any]:
+        """Verification entry of a region file patched or searched by patcher"""
+        stat_result = file_path.stat()
+        return {'kind': 'region', 'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns,
+                'sha256': patcher.sha256, 'uuids': patcher.uuids, 'undecoded': undecoded}
+
+    def _scan_region_file(self, file_path: Path) -> Dict[str, Any]:
+        """Verification entry of a region file, decompressing every chunk that may hold a known UUID"""
+        patcher = AnvilRegionPatcher(self.scan_matcher, scan=functools.partial(self._known_uuids, nbt=True))
+        _, undecoded = patcher.find_file(file_path)
+        return self._region_entry(file_path, patcher, undecoded)
+
+    def _scan_database(self, database: DatabaseTarget) -> Dict[str, Any]:
+        """Verification entry of a database, listing the table and column of every source UUID left"""
+        stat_result = database.path.stat()
+        patcher = SQLiteUUIDPatcher(self.lookup.by_uuid)
+        columns = list(database.columns) if database.columns is not None else None
+        return {'kind': 'database', 'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns,
+                'sha256': self._file_sha256(database.path), 'uuids': patcher.find(database.path, columns)}
+
+    def _region_task(self, file_path: Path) -> Tuple[Optional[str], Optional[str], Optional[str],
+                                                     Optional[Dict], PhaseMetrics]:
+        """Update one region file, return (log message, error message, warning, verification entry, file metrics)"""
+        previous_io, self._io = self._io, PhaseMetrics()
+        try:
+            message, warning, entry = self._update_region_file(file_path)
+            return message, None, warning, entry, self._io
+        except Exception as e:
+            return None, str(e), None, None, self._io
+        finally:
+            self._io = previous_io
+
+    def _run_step(self, step: Callable[[], None]):
+        """Run a conversion step unless the journal shows it finished before an interruption"""
+        if self.journal is not None:
+            if self.journal.is_done('step', step.__name__):
+                return
+            step()
+            self.journal.mark_done('step', step.__name__)
+            return
+        step()
+
+    def _update_databases(self):
+        """Update player UUIDs stored in SQLite databases of plugins and mods"""
+        with self._phase('databases') as metrics:
+            for database in self.databases:
+                if self.journal is not None and self.journal.is_done('database', database.path):
+                    continue
+                if not database.path.is_file():
+                    print(f"Warning: Database {database.path} does not exist")
+                    continue
+                metrics.files += 1
+                try:
+                    changed = self._update_database(database)
+                    if self.verify_enabled:
+                        self.verification.update(database.path, self._scan_database(database), self.lookup.by_uuid)
+                except Exception as e:
+                    self._log_error(f"Error updating database {database.path}: {e}", file=str(database.path))
+                    continue
+                rows = sum(count for _, _, count in changed)
+                if changed:
+                    metrics.rewritten += 1
+                    metrics.replacements += rows
+                    for table, column, count in changed:
+                        self._log_event('database', f"Updated {count} row(s) in {table}.{column}",
+                                        file=str(database.path), table=table, column=column, rows=count)
+                print(f"Updated {rows} UUID(s) in {len(changed)} column(s) of database {database.path}")
+                if self.journal is not None:
+                    self.journal.mark_done('database', database.path)
+
+    def _update_database(self, database: DatabaseTarget) -> List[Tuple[str, str, int]]:
+        """Update one database, return (table, column, rows changed) of its changed columns"""
+        before_write = None
+        if self.snapshot is not None:
+            def before_write(path: Path):
+                # SQLite writes into the database file, so the snapshot needs a copy
+                self.snapshot.preserve(path, copy=True)
+                wal_path = path.with_name(path.name + '-wal')
+                if wal_path.exists():
+                    self.snapshot.preserve(wal_path, copy=True)
+        patcher = SQLiteUUIDPatcher(self.lookup.by_uuid, before_write)
+        columns = list(database.columns) if database.columns is not None else None
+        return patcher.patch(database.path, columns)
+
+    def _update_region_directories(self):
+        """Update all region directories; region files are spread over the worker processes"""
+        with self._phase('regions') as metrics:
+            for dir_path in self.region_dirs:
+                self._update_region_directory(dir_path, metrics)
+
+    def _update_region_directory(self, dir_path: Path, metrics: PhaseMetrics):
+        """Update the region files of one directory"""
+        print(f"Processing region directory: {dir_path}")
+        if not dir_path.is_dir():
+            print(f"Warning: Directory {dir_path} does not exist")
+            return
+
+        region_files = sorted(dir_path.glob('r.*.*.mca'))
+        if self.journal is not None:
+            region_files = [file_path for file_path in region_files
+                            if not self.journal.is_done('region', file_path)]
+        if self.process_pool is None:
+            results = self._map_tasks(self._region_task, region_files, None)
+        else:
+            results = self._map_tasks(_region_worker_task, region_files, self.process_pool)
+
+        updated_count = 0
+        for file_path, (message, error, warning, entry, file_metrics) in zip(region_files, results):
+            metrics.files += 1
+            metrics.add(file_metrics)
+            if warning:
+                print(f"Warning: {warning}")
+                self._log_event('warning', None, warning=warning, file=str(file_path))
+            if entry is not None:
+                self.verification.update(file_path, entry, self.lookup.by_uuid)
+            if error:
+                self._log_error(error, file=str(file_path))
+            elif message:
+                updated_count += 1
+                metrics.rewritten += 1
+                self._log_event('region', message, file=str(file_path))
+            if self.journal is not None and not error:
+                self.journal.mark_done('region', file_path)
+        print(f"Updated {updated_count} of {len(region_files)} region file(s) in {dir_path}")
+
+    def _rename_task(self, task: Tuple[Path, Optional[Path]]) -> Tuple[Path, Optional[Path], Optional[str], Optional[str]]:
+        """Rename one file, return (old path, new path, log message, error message)"""
+        file_path, target_path = task
+        try:
+            new_path, message = self._process_single_file(file_path, target_path)
+            return file_path, new_path, message, None
+        except Exception as e:
+            return file_path, None, None, f"Error renaming {file_path}: {e}"
+
+    def _start_workers(self):
+        """Start the worker pools: threads for renames, processes for content rewriting"""
+        if self.workers <= 1:
+            return
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_content_worker,
+            initargs=(self.players, self.mode_id, self.index_enabled, self.safe_write, self.snapshot,
+                      self.verify_enabled)
+        )
+        print(f"Using {self.workers} workers")
+
+    def _stop_workers(self):
+        """Shut down the worker pools"""
+        for pool in (self.thread_pool, self.process_pool):
+            if pool is not None:
+                pool.shutdown()
+        self.thread_pool = None
+        self.process_pool = None
+
+    def _map_tasks(self, func: Callable, items: Iterable, pool: Optional[Executor]) -> Iterator:
+        """Run func over items, in a pool if one is running; results keep input order"""
+        if pool is None:
+            return map(func, items)
+        if isinstance(pool, ProcessPoolExecutor):
+            # Batch small files to keep inter-process overhead down
+            chunksize = max(1, len(items) // (self.workers * 4))
+            return pool.map(func, items, chunksize=chunksize)
+        return pool.map(func, items)
+
+    # Player data file suffixes; _cyclic.dat must come before .dat
+    PLAYER_FILE_SUFFIXES = ('_cyclic.dat', '.json', '.dat_old', '.dat', '.snbt', '.nbt')
+    # Classifies a file name in one match: a player folder file if it has one of the
+    # suffixes, a player file if the rest of its name is a (lowercase) UUID
+    _PLAYER_FILE_PATTERN = re.compile(
+        r'(?:(?P<uuid>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})|.*)'
+        r'(?P<suffix>' + '|'.join(map(re.escape, PLAYER_FILE_SUFFIXES)) + ')',
+        re.DOTALL
+    )
+
+    def _walk_player_files(self, folder: PlayerFolder,
+                           listing: Optional[Dict[Path, Set[str]]] = None) -> Iterator[Tuple[Path, re.Match]]:
+        """Yield player data files under a folder with their classifier match
+
+        Each directory is read with a single scandir pass, whose entries cache
+        their file type, and is listed completely before its files are yielded,
+        so files renamed by the caller are never seen twice. The names found in
+        each directory are added to listing, if given.
+        """
+        pending = [(folder.path, '', 0)]
+        while pending:
+            dir_path, relative_dir, depth = pending.pop()
+            with os.scandir(dir_path) as scan:
+                entries = list(scan)
+            if listing is not None:
+                listing[dir_path] = {entry.name for entry in entries}
+
+            for entry in entries:
+                relative_path = relative_dir + entry.name
+                if any(fnmatch.fnmatch(relative_path, pattern) for pattern in folder.exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if depth < folder.max_depth:
+                        pending.append((Path(entry.path), relative_path + '/', depth + 1))
+                    continue
+                if not entry.is_file():
+                    continue
+                if folder.include and not any(fnmatch.fnmatch(relative_path, pattern)
+                                              for pattern in folder.include):
+                    continue
+
+                match = self._PLAYER_FILE_PATTERN.fullmatch(entry.name)
+                if match is not None:
+                    yield Path(entry.path), match
+
+    def _rename_player_files(self, folder: PlayerFolder) -> List[Path]:
+        """Rename player data files, return files whose content needs updating"""
+        with self._phase('rename') as metrics:
+            return self._rename_folder_files(folder, metrics)
+
+    def _plan_renames(self, folder: PlayerFolder) -> Tuple[List[Tuple[Path, Optional[Path]]], List[Path]]:
+        """List the player data files of a folder with their new paths (None for other files)
+
+        The plan is checked against the directory listing: a rename onto a name
+        held by a file that is not renamed itself, or onto a name another rename
+        also targets, would overwrite a file. Such files are reported and
+        returned apart from the plan, so neither their names nor their contents
+        are converted.
+        """
+        listing: Dict[Path, Set[str]] = {}
+        plan = [(file_path, self._rename_target(file_path, match))
+                for file_path, match in self._walk_player_files(folder, listing)]
+        sources = {file_path for file_path, target_path in plan if target_path not in (None, file_path)}
+
+        checked = []
+        collided = []
+        targets = set()
+        for file_path, target_path in plan:
+            if target_path is not None and target_path != file_path:
+                taken = target_path.name in listing[target_path.parent] and target_path not in sources
+                if taken or target_path in targets:
+                    self._log_error(f"Not converting {file_path}: {target_path.name} already exists",
+                                    file=str(file_path))
+                    collided.append(file_path)
+                    continue
+                targets.add(target_path)
+            checked.append((file_path, target_path))
+        return checked, collided
+
+    @staticmethod
+    def _rename_temp_path(file_path: Path) -> Path:
+        """Temporary name of a file moved aside because another file is renamed to its name"""
+        return file_path.with_name(file_path.name + '.renaming')
+
+    def _move_aside(self, tasks: List[Tuple[Path, Optional[Path]]]):
+        """Move files whose names are the targets of other renames to temporary names
+
+        Their own renames then start from the temporary name, which also
+        resolves chains and swap cycles of renames.
+        """
+        targets = {target_path for file_path, target_path in tasks if target_path not in (None, file_path)}
+        for file_path, target_path in tasks:
+            if file_path in targets and target_path not in (None, file_path) and file_path.exists():
+                temp_path = self._rename_temp_path(file_path)
+                if self.snapshot is not None:
+                    self.snapshot.record_rename(file_path, temp_path)
+                file_path.rename(temp_path)
+
+    def _rename_folder_files(self, folder: PlayerFolder, metrics: PhaseMetrics) -> List[Path]:
+        """Rename the player data files of one folder"""
+        plan = self.journal.planned(folder.path) if self.journal is not None else None
+        if plan is None:
+            plan, _ = self._plan_renames(folder)
+            if self.journal is not None:
+                self.journal.plan(folder.path, plan)
+
+        # Renames finished before an interruption are not made again
+        content_files = []
+        tasks = plan
+        if self.journal is not None and self.journal.done:
+            tasks = []
+            for file_path, target_path in plan:
+                if self.journal.is_done('rename', file_path) or (
+                        target_path is not None and not file_path.exists() and target_path.exists()
+                        and not self._rename_temp_path(file_path).exists()):
+                    metrics.files += 1
+                    if folder.change_content:
+                        content_files.append(target_path or file_path)
+                else:
+                    tasks.append((file_path, target_path))
+            if len(tasks) < len(plan):
+                print(f"Skipped {len(plan) - len(tasks)} file(s) renamed before the interruption")
+
+        # Free the names that other renames need, then rename (I/O bound, so threads are enough)
+        try:
+            self._move_aside(tasks)
+        except OSError as e:
+            self._log_error(f"Error preparing renames in {folder.path}: {e}", directory=str(folder.path))
+            return content_files
+        file_count = 0
+        renamed_count = 0
+        results = self._map_tasks(self._rename_task, tasks, self.thread_pool)
+        for file_path, new_path, message, error in results:
+            file_count += 1
+            metrics.files += 1
+            if error:
+                self._log_error(error, file=str(file_path))
+                continue
+            if new_path != file_path:
+                renamed_count += 1
+                metrics.renamed += 1
+                self._log_event('rename', message, src=str(file_path), dst=str(new_path))
+                if self.index_enabled:
+                    self.index.rename(file_path, new_path)
+            elif message:
+                self._log_event('unchanged', message, file=str(file_path))
+            if self.journal is not None:
+                self.journal.mark_done('rename', file_path)
+            
+            # If content update is needed, queue the renamed file
+            if folder.change_content:
+                content_files.append(new_path)
+
+        print(f"Renamed {renamed_count} of {file_count} player file(s) in {folder.path}")
+        self._log_event('directory', directory=str(folder.path), files=file_count, renamed=renamed_count)
+        return content_files
+
+    def _update_content_files(self, file_paths: List[Path]) -> Iterator[Tuple[Optional[str], Optional[str], Optional[Dict], PhaseMetrics]]:
+        """Queue content updates; CPU-bound rewriting runs in worker processes"""
+        if self.process_pool is None:
+            return self._map_tasks(self._content_task, file_paths, None)
+        return self._map_tasks(_content_worker_task, file_paths, self.process_pool)
+
+    def _rename_target(self, file_path: Path, match: re.Match) -> Optional[Path]:
+        """New path of a player data file, None if the file does not belong to a known player"""
+        # Only hyphenated UUID stems are player files
+        if match['uuid'] is None:
+            return None
+        target_uuid = self.lookup.by_uuid.get(match['uuid'])
+        if target_uuid is None:
+            return None
+        return file_path.parent / f"{target_uuid}{match['suffix']}"
+
+    def _process_single_file(self, file_path: Path, new_path: Optional[Path]) -> Tuple[Path, Optional[str]]:
+        """Process single file rename, return renamed file path and log message"""
+        if new_path is None:
+            return file_path, None
+        
+        # Only rename if new filename is different from original
+        if new_path != file_path:
+            # A file moved aside by _move_aside continues from its temporary name
+            source_path = self._rename_temp_path(file_path)
+            if not source_path.exists():
+                source_path = file_path
+            if new_path.exists():
+                # Never overwrite; the plan rules this out unless the folder changed since
+                raise FileExistsError(f"{new_path.name} already exists")
+            if self.snapshot is not None:
+                self.snapshot.record_rename(source_path, new_path)
+            source_path.rename(new_path)
+            return new_path, f"Renamed: {file_path.name} -> {new_path.name}"
+        else:
+            return file_path, f"No rename needed: {file_path.name} (same filename)"
+
+    def _collect_content_results(self, dir_path: Path, content_files: List[Path],
+                                 results: Iterator, metrics: PhaseMetrics):
+        """Log the content updates of one directory as they complete"""
+        print(f"Updating file content in: {dir_path}")
+        updated_count = 0
+        skipped_count = 0
+        for file_path, (message, error, index_entry, file_metrics) in zip(content_files, results):
+            metrics.files += 1
+            metrics.add(file_metrics)
+            if error:
+                self._log_error(error, file=str(file_path))
+                continue
+            skipped_count += file_metrics.skipped
+            if message:
+                updated_count += 1
+                metrics.rewritten += 1
+                self._log_event('content', message, file=str(file_path))
+            if index_entry is not None:
+                if self.index_enabled:
+                    self.index.update(file_path, index_entry)
+                if self.verify_enabled:
+                    self.verification.update(file_path, index_entry, self.lookup.by_uuid)
+            if self.journal is not None:
+                self.journal.mark_done('content', file_path)
+        print(f"Updated content of {updated_count} of {len(content_files)} file(s) in {dir_path}, "
+              f"{skipped_count} skipped by the prefilter")
+
+    def convert(self, resume: bool = False):
+        """Main conversion method; with resume, finish the conversion recorded in the journal"""
+        start = time.perf_counter()
+        if self.trace_memory:
+            tracemalloc.start()
+        try:
+            header = self.journal.load() if self.journal is not None else None
+            if resume:
+                if header is None:
+                    raise RuntimeError(f"No interrupted conversion to resume in: {self.journal.journal_path}")
+                # server.properties may already be switched, so the journal has the direction
+                self.mode_id = header['mode_id']
+                self.journal.reopen()
+                print(f"Resuming the conversion started at {header['created']}")
+            else:
+                if header is not None:
+                    raise RuntimeError("The previous conversion was interrupted; run the script with "
+                                       f"--resume to finish it or delete {self.journal.journal_path}")
+                # Determine current mode from server.properties
+                self.mode_id = self._determine_mode_from_server_properties()
+                if self.journal is not None:
+                    self.journal.start(self.mode_id)
+            
+            if self.mode_id == 1:
+                print("Mode Change: Online -> Offline")
+            else:
+                print("Mode Change: Offline -> Online")
+
+            # A resumed run keeps the files verified before the interruption
+            if self.verify_enabled and resume:
+                self.verification.load()
+
+            # Use the UUID index from an earlier scan of the same players, if asked to
+            if self.use_index:
+                self.index_enabled = self.index.load(self.players.fingerprint())
+                if self.index_enabled:
+                    print(f"Using UUID index: {self.index.index_path}")
+                else:
+                    print(f"Warning: no UUID index for these players in {self.index.index_path}, "
+                          "run the script with --scan first; converting without it")
+
+            if self.snapshot is not None:
+                if resume and self.snapshot.manifest_path.exists():
+                    self.snapshot.open()
+                else:
+                    # The snapshot folder is emptied first, so it must not be any of the converted paths
+                    protected = ([folder.path for folder in self.dirs] + self.region_dirs
+                                 + [database.path for database in self.databases])
+                    self.snapshot.create(self.mode_id, protected)
+                print(f"Saving a snapshot of changed files to: {self.snapshot.snapshot_dir}")
+
+            # Build lookup tables and the UUID matcher once for the whole run
+            self._prepare_lookup()
+            self._start_workers()
+
+            # Update UUID configuration files
+            self._run_step(self._update_usercache)
+            self._run_step(self._update_ops)
+            self._run_step(self._update_whitelist)
+            self._run_step(self._update_banned_players)
+            self._run_step(self._update_usernamecache)
+
+            # Process all directories; content updates of one directory run
+            # in the background while the next directory is renamed
+            pending_updates = []
+            for folder in self.dirs:
+                print(f"Processing directory: {folder.path} (update content: {folder.change_content})")
+                content_files = self._rename_player_files(folder)
+                if content_files and self.index_enabled:
+                    content_files = self._skip_indexed_files(content_files)
+                if content_files and self.journal is not None:
+                    content_files = [file_path for file_path in content_files
+                                     if not self.journal.is_done('content', file_path)]
+                if content_files:
+                    pending_updates.append(
+                        (folder.path, content_files, self._update_content_files(content_files))
+                    )
+
+            with self._phase('content') as metrics:
+                for dir_path, content_files, results in pending_updates:
+                    self._collect_content_results(dir_path, content_files, results, metrics)
+
+            # Update entity ownership stored in region files
+            self._update_region_directories()
+
+            # Plugin and mod data kept in SQLite databases
+            if self.databases:
+                self._update_databases()
+
+            # Finally update server.properties
+            self._run_step(self._update_server_properties)
+
+            if self.verify_enabled:
+                with self._phase('verify'):
+                    self._record_server_files()
+                    self.verification.mode_id = self.mode_id
+                    self.verification.save()
+                    self._report_verification(self._stale_player_names())
+
+            if self.index_enabled:
+                self.index.save()
+            if self.journal is not None:
+                # Files that failed stay pending, so --resume can retry them
+                self.journal.close(complete=not self.failures)
+            if self.snapshot is not None:
+                self.snapshot.close(complete=True)
+                print("Run the script with --rollback to undo this conversion")
+
+            self._report_metrics(time.perf_counter() - start)
+            if self.failures:
+                print(f"Conversion completed with {len(self.failures)} error(s):")
+                for error in self.failures:
+                    print(f"  {error}")
+            else:
+                print("Conversion completed!")
+            print(f"Detailed log saved to: {self.log_file}")
+
+        except Exception as e:
+            print(f"Error during conversion: {e}")
+            raise
+        finally:
+            if self.trace_memory:
+                tracemalloc.stop()
+            self._stop_workers()
+            if self.journal is not None:
+                self.journal.close()
+            if self.snapshot is not None:
+                self.snapshot.close()
+            # Restore stdout and flush the logs
+            self._close_logging()
+
+    def scan(self):
+        """Build or refresh the UUID occurrence index without converting anything"""
+        try:
+            # Reuse entries of files that did not change since the last scan of the same players
+            self.index.load(self.players.fingerprint())
+            self.index_enabled = True
+            self._prepare_lookup()
+            self._start_workers()
+
+            for folder in self.dirs:
+                if not folder.change_content:
+                    continue
+                dir_path = folder.path
+                print(f"Scanning directory: {dir_path}")
+                file_paths = [file_path for file_path, _ in self._walk_player_files(folder)]
+                stale_files = [file_path for file_path in file_paths if self.index.get(file_path) is None]
+
+                if self.process_pool is None:
+                    results = self._map_tasks(self._scan_task, stale_files, None)
+                else:
+                    results = self._map_tasks(_scan_worker_task, stale_files, self.process_pool)
+                with_uuids = 0
+                for file_path, (index_entry, error) in zip(stale_files, results):
+                    if error:
+                        self._log_error(error, file=str(file_path))
+                        continue
+                    self.index.update(file_path, index_entry)
+                    if index_entry['uuids']:
+                        with_uuids += 1
+                        self._log_event('scan', f"Found {len(index_entry['uuids'])} UUID(s) in {file_path.name}",
+                                        file=str(file_path), uuids=len(index_entry['uuids']))
+                self.index.prune(dir_path, file_paths, folder.max_depth)
+                print(f"Scanned {len(stale_files)} file(s) ({with_uuids} with player UUIDs), "
+                      f"{len(file_paths) - len(stale_files)} unchanged in {dir_path}")
+
+            self.index.save()
+            print(f"UUID index saved to: {self.index.index_path}")
+
+        except Exception as e:
+            print(f"Error during scan: {e}")
+            raise
+        finally:
+            self._stop_workers()
+            self._close_logging()
+
+    def dry_run(self):
+        """Print the renames a conversion would make, without changing anything"""
+        try:
+            self.mode_id = self._determine_mode_from_server_properties()
+            print(f"Dry run, mode change: {'Online -> Offline' if self.mode_id == 1 else 'Offline -> Online'}")
+            self._prepare_lookup()
+
+            for folder in self.dirs:
+                if not folder.path.is_dir():
+                    print(f"Directory not found: {folder.path}")
+                    continue
+                plan, collided = self._plan_renames(folder)
+                renames = [(file_path, target_path) for file_path, target_path in plan
+                           if target_path not in (None, file_path)]
+                targets = {target_path for _, target_path in renames}
+                for file_path, target_path in renames:
+                    # Files holding a name another rename needs go through a temporary name
+                    via = f" (via {self._rename_temp_path(file_path).name})" if file_path in targets else ""
+                    print(f"  {file_path.relative_to(folder.path)} -> {target_path.name}{via}")
+                print(f"Would rename {len(renames)} of {len(plan) + len(collided)} player file(s) in {folder.path}")
+                self._log_event('plan', directory=str(folder.path), files=len(plan) + len(collided),
+                                renamed=len(renames), collided=len(collided))
+
+            if self.failures:
+                print(f"Dry run found {len(self.failures)} problem(s):")
+                for error in self.failures:
+                    print(f"  {error}")
+            else:
+                print("Dry run completed, nothing was changed")
+        except Exception as e:
+            print(f"Error during dry run: {e}")
+            raise
+        finally:
+            self._close_logging()
+
+    def verify(self) -> bool:
+        """Check the last conversion again, rereading only files changed since, return whether it passed"""
+        try:
+            if not self.verification.load():
+                print(f"No verification record found: {self.verification.record_path}")
+                return False
+            self.mode_id = self.verification.mode_id
+            self.verify_enabled = True
+            self._prepare_lookup()
+
+            rescanned = 0
+            for key, entry in list(self.verification.files.items()):
+                file_path = Path(self.config['root_dir']) / key
+                try:
+                    stat_result = file_path.stat()
+                except FileNotFoundError:
+                    print(f"Warning: {key} no longer exists")
+                    del self.verification.files[key]
+                    continue
+                if entry['size'] == stat_result.st_size and entry['mtime_ns'] == stat_result.st_mtime_ns:
+                    continue
+                # Touched but not changed, e.g. copied with a new mtime
+                if self._file_sha256(file_path) == entry['sha256']:
+                    entry['size'], entry['mtime_ns'] = stat_result.st_size, stat_result.st_mtime_ns
+                    continue
+                self.verification.update(file_path, self._rescan(file_path, entry.get('kind')), self.lookup.by_uuid)
+                rescanned += 1
+            print(f"Rescanned {rescanned} file(s) changed since the conversion")
+            self.verification.save()
+            return self._report_verification(self._stale_player_names())
+        except Exception as e:
+            print(f"Error during verification: {e}")
+            raise
+        finally:
+            self._close_logging()
+
+    def _rescan(self, file_path: Path, kind: Optional[str]) -> Dict[str, Any]:
+        """Scan a recorded file again with the reader for its kind"""
+        if kind == 'region':
+            return self._scan_region_file(file_path)
+        if kind == 'database':
+            database = next((database for database in self.databases if database.path == file_path),
+                            DatabaseTarget(file_path))
+            return self._scan_database(database)
+        return self._scan_file_content(file_path)
+
+    def rollback(self):
+        """Restore the files changed by the last conversion from its snapshot"""
+        try:
+            snapshot = ConversionSnapshot(self._snapshot_dir(), Path(self.config['root_dir']))
+            if not snapshot.manifest_path.exists():
+                print(f"No snapshot found in: {snapshot.snapshot_dir}")
+                return
+            restored, undone = snapshot.rollback()
+            print(f"Rollback completed: {restored} file(s) restored, {undone} rename(s) undone")
+            self._log_event('rollback', restored=restored, renamed=undone)
+        except Exception as e:
+            print(f"Error during rollback: {e}")
+            raise
+        finally:
+            self._close_logging()
+
+
+class _PrefixedConsole:
+    """Console writer that prefixes every line with a server name and writes whole lines only"""
+
+    def __init__(self, name: str, console, lock: threading.Lock):
+        self.prefix = f"[{name}] "
+        self.console = console
+        self.lock = lock
+        self.pending = ''
+
+    def write(self, text):
+        self.pending += text
+        if '\n' not in self.pending:
+            return
+        text, self.pending = self.pending.rsplit('\n', 1)
+        lines = ''.join(f"{self.prefix}{line}\n" for line in text.split('\n'))
+        with self.lock:
+            self.console.write(lines)
+
+    def flush(self):
+        if self.pending:
+            self.write('\n')
+        with self.lock:
+            self.console.flush()
+
+
+class ThreadRoutedStdout:
+    """Stand-in for sys.stdout while the servers of a fleet convert in parallel threads
+
+    Each server thread registers its converter, so that prints reach that
+    converter's log; output of other threads goes to the console as before.
+    """
+
+    def __init__(self, console):
+        self.console = console
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def console_for(self, name: str) -> _PrefixedConsole:
+        """Console writer for the converter of one server"""
+        return _PrefixedConsole(name, self.console, self._lock)
+
+    def register(self, writer):
+        self._local.writer = writer
+
+    def unregister(self):
+        self._local.writer = None
+
+    def write(self, text):
+        writer = getattr(self._local, 'writer', None)
+        if writer is not None:
+            writer.write(text)
+            return
+        with self._lock:
+            self.console.write(text)
+
+    def flush(self):
+        writer = getattr(self._local, 'writer', None)
+        (writer or self.console).flush()
+
+
+class FleetConverter:
+    """Converts several servers that share one player base, such as the backends of a proxy
+
+    servers in Info.json lists the servers, each a root_dir or an object with
+    root_dir and the Info.json keys that differ for it; the other keys apply to
+    every server. Players are prepared and the UUID matchers compiled once,
+    then up to fleet_workers servers are converted at a time, each with its
+    own workers.
+    """
+
+    # Files of a single server, given a per-server name by default
+    SERVER_FILES = {'log_file': 'log.txt', 'log_json': None, 'index_file': 'uuid_index.json',
+                    'journal_file': 'conversion_journal.jsonl', 'verify_file': 'uuid_verify.json'}
+
+    def __init__(self, config: Dict[str, Any], servers: Optional[List[str]] = None,
+                 fleet_workers: Optional[int] = None, metrics_file: Optional[str] = None, **options):
+        self.config = config
+        self.script_dir = Path(__file__).parent
+        self.server_configs = self._prepare_servers(servers or config.get('servers', []))
+        self.fleet_workers = max(1, int(fleet_workers or config.get('fleet_workers', min(4, len(self.server_configs)))))
+        self.metrics_file = config.get('metrics_file') if metrics_file is None else metrics_file
+        # Options such as workers and safe_write, passed to the converter of every server
+        self.options = options
+        self.results: List[Dict[str, Any]] = []
+
+    def _prepare_servers(self, servers: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Full configuration of every server"""
+        base = {key: value for key, value in self.config.items()
+                if key not in ('servers', 'fleet_workers', 'metrics_file')}
+        server_configs = []
+        names = set()
+        for server in servers:
+            if isinstance(server, str):
+                server = {'root_dir': server}
+            server_config = dict(base, **server)
+            name = server_config.setdefault('name', Path(server_config['root_dir']).name)
+            if name in names:
+                raise ValueError(f"Duplicate server name: {name}")
+            names.add(name)
+            for key, default in self.SERVER_FILES.items():
+                file_name = base.get(key, default)
+                if key not in server and file_name:
+                    stem, suffix = os.path.splitext(file_name)
+                    server_config[key] = f"{stem}_{name}{suffix}"
+            server_configs.append(server_config)
+        if not server_configs:
+            raise ValueError("No servers configured")
+        return server_configs
+
+    def _prepare_shared(self) -> Tuple[PlayerTable, Dict[int, Tuple[PlayerLookup, UUIDMatcher]]]:
+        """Prepare the players and compile the matchers of both directions once"""
+        # Players of every server's usercache.json are known on all of them
+        players = MinecraftUUIDConverter.prepare_players(
+            self.server_configs[0], self.script_dir,
+            [Path(server_config['root_dir']) for server_config in self.server_configs]
+        )
+        shared_matchers = {}
+        for mode_id in (1, 2):
+            lookup = players.lookup(mode_id)
+            shared_matchers[mode_id] = (lookup, UUIDMatcher(lookup.by_uuid))
+        return players, shared_matchers
+
+    def _run_server(self, server_config: Dict[str, Any], action: str, router: ThreadRoutedStdout,
+                    players: PlayerTable, shared_matchers: Dict) -> Dict[str, Any]:
+        """Run one action on one server, return its entry of the fleet report"""
+        result = {'name': server_config['name'], 'root_dir': server_config['root_dir']}
+        start = time.perf_counter()
+        converter = None
+        try:
+            converter = MinecraftUUIDConverter(server_config, players=players, shared_matchers=shared_matchers,
+                                               stdout_router=router, **self.options)
+            if action == 'resume':
+                converter.convert(resume=True)
+            elif action == 'verify':
+                result['verified'] = converter.verify()
+            else:
+                getattr(converter, action)()
+        except Exception as e:
+            result['error'] = str(e)
+        total = time.perf_counter() - start
+        if converter is not None and converter.metrics:
+            result.update(converter._metrics_report(total))
+        else:
+            result['total_seconds'] = round(total, 6)
+        if converter is not None and converter.failures:
+            result['errors'] = len(converter.failures)
+        return result
+
+    def run(self, action: str = 'convert') -> bool:
+        """Run convert, resume, scan, verify or rollback on every server, return False if a verification failed"""
+        start = time.perf_counter()
+        print(f"Fleet: {len(self.server_configs)} server(s), {self.fleet_workers} at a time")
+        players, shared_matchers = self._prepare_shared()
+
+        router = ThreadRoutedStdout(sys.stdout)
+        sys.stdout = router
+        try:
+            with ThreadPoolExecutor(max_workers=self.fleet_workers) as pool:
+                self.results = list(pool.map(
+                    lambda server_config: self._run_server(server_config, action, router, players, shared_matchers),
+                    self.server_configs
+                ))
+        finally:
+            sys.stdout = router.console
+        self._report(time.perf_counter() - start)
+        return all(result.get('verified', 'error' not in result) for result in self.results)
+
+    def _report(self, total_seconds: float):
+        """Print the per-server summary and save the consolidated JSON report"""
+        print("\nFleet summary:")
+        print(f"  {'server':<20}{'mode':>17}{'seconds':>10}{'renamed':>10}{'rewritten':>11}{'errors':>8}")
+        for result in self.results:
+            phases = result.get('phases', {}).values()
+            renamed = sum(phase.get('renamed', 0) for phase in phases)
+            rewritten = sum(phase.get('rewritten', 0) for phase in phases)
+            errors = result.get('errors', 0) + ('error' in result)
+            print(f"  {result['name']:<20}{result.get('mode', '-'):>17}{result['total_seconds']:>10.3f}"
+                  f"{renamed:>10}{rewritten:>11}{errors:>8}")
+            if 'error' in result:
+                print(f"    Error: {result['error']}")
+        print(f"  {'total':<20}{'':>17}{total_seconds:>10.3f}")
+
+        if self.metrics_file:
+            report = {'fleet_workers': self.fleet_workers, 'total_seconds': round(total_seconds, 6),
+                      'servers': self.results}
+            with open(self.script_dir / self.metrics_file, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=4)
+            print(f"Fleet report saved to: {self.script_dir / self.metrics_file}")
+
+
+# Converter used by content worker processes; only the players and matchers are needed there
+_worker_converter: Optional[MinecraftUUIDConverter] = None
+
+
+def _init_content_worker(players: PlayerTable, mode_id: int, index_enabled: bool, safe_write: bool,
+                         snapshot: Optional[ConversionSnapshot], verify_enabled: bool):
+    """Set up a content worker process"""
+    global _worker_converter
+    _worker_converter = MinecraftUUIDConverter.__new__(MinecraftUUIDConverter)
+    _worker_converter.players = players
+    _worker_converter.shared_matchers = None
+    _worker_converter.mode_id = mode_id
+    _worker_converter.index_enabled = index_enabled
+    _worker_converter.verify_enabled = verify_enabled
+    _worker_converter.safe_write = safe_write
+    _worker_converter.snapshot = snapshot
+    if snapshot is not None:
+        snapshot.open()
+    _worker_converter._io = PhaseMetrics()
+    _worker_converter._prepare_lookup()
+
+
+def _content_worker_task(file_path: Path) -> Tuple[Optional[str], Optional[str], Optional[Dict], PhaseMetrics]:
+    """Update content of one file in a worker process"""
+    return _worker_converter._content_task(file_path)
+
+
+def _scan_worker_task(file_path: Path) -> Tuple[Optional[Dict], Optional[str]]:
+    """Scan one file in a worker process"""
+    return _worker_converter._scan_task(file_path)
+
+
+def _region_worker_task(file_path: Path) -> Tuple[Optional[str], Optional[str], Optional[str],
+                                                  Optional[Dict], PhaseMetrics]:
+    """Update one region file in a worker process"""
+    return _worker_converter._region_task(file_path)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Minecraft server UUID and online-mode converter")
+    parser.add_argument('--workers', type=int,
+                        help="number of worker threads/processes (overrides 'workers' in Info.json)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="only print per-directory summaries instead of a line per file")
+    parser.add_argument('--log-json', metavar='PATH',
+                        help="also write a machine-readable JSON-lines log to PATH")
+    parser.add_argument('--safe-write', action='store_true', default=None,
+                        help="rewrite changed files through a temporary file instead of patching them in place")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="save per-phase metrics as a JSON report to PATH")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="run under cProfile and save the statistics to PATH (for pstats/snakeviz)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record the peak Python memory of each phase with tracemalloc")
+    parser.add_argument('--snapshot', action='store_true', default=None,
+                        help="save the files the conversion changes so that --rollback can undo it")
+    parser.add_argument('--rollback', action='store_true',
+                        help="undo the last conversion made with a snapshot")
+    parser.add_argument('--journal', action='store_true', default=None,
+                        help="record the conversion in a journal so that an interrupted run can be resumed")
+    parser.add_argument('--resume', action='store_true',
+                        help="finish a conversion that was interrupted, skipping the work already done")
+    parser.add_argument('--servers', nargs='+', metavar='ROOT_DIR',
+                        help="convert several servers that share the players of Info.json "
+                             "(overrides 'servers' in Info.json)")
+    parser.add_argument('--fleet-workers', type=int,
+                        help="number of servers converted at the same time in fleet mode")
+    parser.add_argument('--verify-conversion', action='store_true', default=None,
+                        help="record hashes and leftover source UUIDs of converted files and report them")
+    parser.add_argument('--verify', action='store_true',
+                        help="check the last conversion again, rereading only files changed since")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="print the renames a conversion would make without changing anything")
+    parser.add_argument('--scan', action='store_true',
+                        help="only build the UUID index of content files; conversions with "
+                             "--use-index then skip files without player UUIDs")
+    parser.add_argument('--use-index', action='store_true', default=None,
+                        help="skip content files that the UUID index of --scan shows hold no UUID to convert")
+    args = parser.parse_args()
+
+    if args.rollback:
+        action = 'rollback'
+    elif args.verify:
+        action = 'verify'
+    elif args.scan:
+        action = 'scan'
+    elif args.dry_run:
+        action = 'dry_run'
+    else:
+        action = 'resume' if args.resume else 'convert'
+
+    try:
+        with open('Info.json', 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        options = {
+            'workers': args.workers,
+            'verbose': False if args.quiet else None,
+            'safe_write': args.safe_write,
+            'snapshot': args.snapshot,
+            'journal': True if args.resume else args.journal,
+            'verify': args.verify_conversion,
+            'use_index': args.use_index,
+        }
+        if args.servers or config.get('servers'):
+            # Fleet mode: every server gets its own log files, named after the server
+            if args.log_json:
+                config['log_json'] = args.log_json
+            fleet = FleetConverter(config, args.servers, args.fleet_workers, args.metrics_json, **options)
+            run = functools.partial(fleet.run, action)
+        else:
+            converter = MinecraftUUIDConverter(
+                config,
+                log_json=args.log_json,
+                metrics_file=args.metrics_json,
+                trace_memory=args.trace_memory,
+                **options
+            )
+            if action == 'resume':
+                run = functools.partial(converter.convert, resume=True)
+            else:
+                run = getattr(converter, action)
+        if args.profile:
+            # Only the main process is profiled; worker processes are not
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(run)
+            finally:
+                profiler.dump_stats(args.profile)
+                print(f"Profile saved to: {args.profile}")
+        else:
+            result = run()
+        if action == 'verify' and not result:
+            sys.exit(1)
+    except FileNotFoundError:
+        print("Error: Configuration file Info.json not found")
+    except json.JSONDecodeError:
+        print("Error: Configuration file format is incorrect")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
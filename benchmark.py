@@ -0,0 +1,492 @@
+"""Benchmark for MCServer UUID and Online-mode Conventer.py
+
+Generates a synthetic server under a temporary directory, records the phase
+metrics of convert() in both directions and checks that converting back
+restores every file byte for byte, and that no source UUID is left after
+either conversion. Results are saved as JSON so that runs of different
+versions can be compared with --baseline.
+
+Usage: python benchmark.py --players 1000 --output results.json
+"""
+import argparse
+import contextlib
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+SCRIPT_PATH = Path(__file__).parent / "MCServer UUID and Online-mode Conventer.py"
+# Folder of the server root for the converter's log, index and record files
+RUN_DIR = '.benchmark'
+
+# Load the converter under a fixed module name so worker processes can unpickle its tasks
+_spec = importlib.util.spec_from_file_location("uuid_converter", SCRIPT_PATH)
+converter_module = importlib.util.module_from_spec(_spec)
+sys.modules["uuid_converter"] = converter_module
+_spec.loader.exec_module(converter_module)
+
+
+def _nbt_string(text: str) -> bytes:
+    data = text.encode('utf-8')
+    return struct.pack('>H', len(data)) + data
+
+
+def _nbt_uuid(player_uuid: str) -> bytes:
+    return struct.pack('>i', 4) + converter_module.uuid_to_bytes(player_uuid)
+
+
+def player_nbt(player_uuid: str, friend_uuid: str, size: int) -> bytes:
+    """Minimal player .dat payload holding UUIDs as int array, long pair and string"""
+    friend = converter_module.uuid_to_bytes(friend_uuid)
+    filler = b'\x00' * max(0, size - 200)
+    return b''.join([
+        b'\x0a', _nbt_string(''),
+        b'\x0b', _nbt_string('UUID'), _nbt_uuid(player_uuid),
+        b'\x06', _nbt_string('Health'), struct.pack('>d', 20.0),
+        b'\x0a', _nbt_string('Leash'),
+        b'\x04', _nbt_string('OwnerUUIDMost'), friend[:8],
+        b'\x04', _nbt_string('OwnerUUIDLeast'), friend[8:],
+        b'\x08', _nbt_string('LastFriend'), _nbt_string(friend_uuid),
+        b'\x00',
+        b'\x07', _nbt_string('Filler'), struct.pack('>i', len(filler)), filler,
+        b'\x00',
+    ])
+
+
+SECTOR_SIZE = 4096
+GZIP, ZLIB, UNCOMPRESSED, EXTERNAL = 1, 2, 3, 128
+
+
+def _compress_chunk(data: bytes, compression: int) -> bytes:
+    if compression == GZIP:
+        return gzip.compress(data, mtime=0)
+    if compression == ZLIB:
+        return zlib.compress(data)
+    return data
+
+
+def entity_chunk(rnd: random.Random, owners: List[str], compression: int, size: int) -> bytes:
+    """Compressed chunk payload with one owned entity per owner
+
+    Random filler is sized so that the chunk fills its sectors exactly, so any
+    growth on recompression makes the converter move it to new sectors.
+    """
+    entities = b''.join(b''.join([
+        b'\x08', _nbt_string('id'), _nbt_string('minecraft:wolf'),
+        b'\x0b', _nbt_string('UUID'), _nbt_uuid(converter_module.bytes_to_uuid(rnd.randbytes(16))),
+        b'\x0b', _nbt_string('Owner'), _nbt_uuid(owner),
+        b'\x08', _nbt_string('LastHurtBy'), _nbt_string(owner),
+        b'\x00',
+    ]) for owner in owners)
+    pool = rnd.randbytes(size + 2 * SECTOR_SIZE)
+    filler_size = size
+    for _ in range(20):
+        data = b''.join([
+            b'\x0a', _nbt_string(''),
+            b'\x03', _nbt_string('DataVersion'), struct.pack('>i', 3465),
+            b'\x09', _nbt_string('Entities'), b'\x0a', struct.pack('>i', len(owners)), entities,
+            b'\x07', _nbt_string('Filler'), struct.pack('>i', filler_size), pool[:filler_size],
+            b'\x00',
+        ])
+        payload = _compress_chunk(data, compression)
+        slack = -(len(payload) + 5) % SECTOR_SIZE
+        if slack == 0 or filler_size + slack > len(pool):
+            break
+        filler_size += slack
+    return payload
+
+
+def write_region(path: Path, chunks: Dict[int, Tuple[int, bytes]]):
+    """Write a region file from {chunk index: (compression, payload)}, external chunks to .mcc files"""
+    region_x, region_z = (int(part) for part in path.name.split('.')[1:3])
+    locations = bytearray(SECTOR_SIZE)
+    body = []
+    sector = 2
+    for index, (compression, payload) in sorted(chunks.items()):
+        if compression & EXTERNAL:
+            chunk_name = f"c.{region_x * 32 + index % 32}.{region_z * 32 + index // 32}.mcc"
+            (path.parent / chunk_name).write_bytes(payload)
+            payload = b''
+        chunk = struct.pack('>iB', len(payload) + 1, compression) + payload
+        sectors = -(-len(chunk) // SECTOR_SIZE)
+        body.append(chunk + b'\x00' * (sectors * SECTOR_SIZE - len(chunk)))
+        locations[index * 4:index * 4 + 4] = sector.to_bytes(3, 'big') + bytes([sectors])
+        sector += sectors
+    path.write_bytes(bytes(locations) + bytes(SECTOR_SIZE) + b''.join(body))
+
+
+def region_chunks(path: Path) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield (index, compression, payload) for every chunk of a region file"""
+    region_x, region_z = (int(part) for part in path.name.split('.')[1:3])
+    raw = path.read_bytes()
+    for index in range(1024):
+        sector = int.from_bytes(raw[index * 4:index * 4 + 3], 'big')
+        if sector == 0:
+            continue
+        length, compression = struct.unpack_from('>iB', raw, sector * SECTOR_SIZE)
+        if compression & EXTERNAL:
+            chunk_name = f"c.{region_x * 32 + index % 32}.{region_z * 32 + index // 32}.mcc"
+            payload = (path.parent / chunk_name).read_bytes()
+        else:
+            payload = raw[sector * SECTOR_SIZE + 5:sector * SECTOR_SIZE + 4 + length]
+        yield index, compression, payload
+
+
+def write_database(path: Path, player_list: List[Dict[str, str]]):
+    """Plugin database storing player UUIDs hyphenated, bare upper case and as 16-byte blobs"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("CREATE TABLE accounts (uuid TEXT PRIMARY KEY, balance REAL)")
+        connection.execute("CREATE TABLE homes (id INTEGER PRIMARY KEY, owner TEXT, world TEXT)")
+        connection.execute("CREATE TABLE claims (id INTEGER PRIMARY KEY, owner BLOB)")
+        connection.executemany("INSERT INTO accounts VALUES (?, ?)",
+                               [(player['Online_UUID'], 100.0) for player in player_list])
+        connection.executemany("INSERT INTO homes (owner, world) VALUES (?, 'world')",
+                               [(player['Online_UUID'].replace('-', '').upper(),) for player in player_list])
+        connection.executemany("INSERT INTO claims (owner) VALUES (?)",
+                               [(converter_module.uuid_to_bytes(player['Online_UUID']),) for player in player_list])
+    connection.close()
+
+
+def database_values(path: Path) -> Iterator[Any]:
+    """Yield every value of every table of a database"""
+    connection = sqlite3.connect(path)
+    try:
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            for row in connection.execute(f'SELECT * FROM "{table}"'):
+                yield from row
+    finally:
+        connection.close()
+
+
+def _padding(rnd: random.Random, size: int) -> str:
+    """Filler lines that look like quest data but hold no UUID"""
+    lines = []
+    length = 0
+    while length < size:
+        line = f'\ttask_{rnd.randrange(1 << 30):x}: {{ count: {rnd.randrange(64)}L, type: "item" }}\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+def generate_server(root: Path, players: int, files: int, size: int, density: float, seed: int = 1) -> Path:
+    """Generate a synthetic online-mode server, return the path of its Info.json
+
+    files is the number of shared files in each FTB folder, size the rough size of
+    every content file in bytes and density the player UUIDs per KiB of shared files.
+    """
+    rnd = random.Random(seed)
+    player_list = []
+    for i in range(players):
+        name = f"Player{i}"
+        online = converter_module.bytes_to_uuid(rnd.getrandbits(128).to_bytes(16, 'big'))
+        # Keep the version 4 bits of a real online UUID
+        online = online[:14] + '4' + online[15:]
+        player_list.append({'name': name, 'Online_UUID': online, 'Offline_UUID': converter_module.offline_uuid(name)})
+
+    folders = ['world/advancements', 'world/playerdata', 'world/stats', 'world/ftbquests/chapters',
+               'world/ftbteams/party', 'world/ftbteams/player', 'world/entities']
+    for folder in folders:
+        (root / folder).mkdir(parents=True, exist_ok=True)
+
+    (root / 'server.properties').write_text("motd=Benchmark\nonline-mode=true\nmax-players=20\n", encoding='utf-8')
+    json_files = {
+        'usercache.json': [{'name': p['name'], 'uuid': p['Online_UUID'], 'expiresOn': '2030-01-01 00:00:00 +0000'}
+                           for p in player_list],
+        'ops.json': [{'uuid': p['Online_UUID'], 'name': p['name'], 'level': 4, 'bypassesPlayerLimit': False}
+                     for p in player_list[:max(1, players // 50)]],
+        'usernamecache.json': {p['Online_UUID']: p['name'] for p in player_list},
+    }
+    for file_name, data in json_files.items():
+        with open(root / file_name, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=4, ensure_ascii=False)
+
+    for player in player_list:
+        player_uuid = player['Online_UUID']
+        friend_uuid = rnd.choice(player_list)['Online_UUID']
+        advancements = {'minecraft:story/root': {'criteria': {'crafting_table': '2024-01-01'}, 'done': True},
+                        'DataVersion': 3465}
+        (root / 'world/advancements' / f"{player_uuid}.json").write_text(json.dumps(advancements, indent=2))
+        (root / 'world/stats' / f"{player_uuid}.json").write_text(json.dumps({'stats': {}, 'DataVersion': 3465}))
+        nbt = player_nbt(player_uuid, friend_uuid, size)
+        (root / 'world/playerdata' / f"{player_uuid}.dat").write_bytes(gzip.compress(nbt, mtime=0))
+        (root / 'world/playerdata' / f"{player_uuid}.dat_old").write_bytes(gzip.compress(nbt, mtime=0))
+        (root / 'world/ftbteams/player' / f"{player_uuid}.snbt").write_text(
+            f'{{\n\tid: "{player_uuid}"\n\tname: "{player["name"]}"\n\tteam: "{friend_uuid}"\n}}\n'
+            + _padding(rnd, size)
+        )
+
+    # Shared files mention random players, hyphenated or bare, sometimes right
+    # after other hex digits
+    mentions = max(1, int(density * size / 1024))
+    for i in range(files):
+        for folder in ('world/ftbquests/chapters', 'world/ftbteams/party'):
+            lines = []
+            for player in rnd.sample(player_list, min(mentions, players)):
+                player_uuid = player['Online_UUID']
+                form = rnd.random()
+                if form < 0.45:
+                    player_uuid = player_uuid.replace('-', '')
+                elif form < 0.5:
+                    player_uuid = 'f' * 24 + player_uuid
+                elif form < 0.55:
+                    player_uuid = rnd.choice(player_list)['Online_UUID'].replace('-', '') + player_uuid
+                lines.append(f'\tmember: "{player_uuid}"\n')
+            (root / folder / f"file{i}.snbt").write_text('{\n' + ''.join(lines) + _padding(rnd, size) + '}\n')
+
+    # Pets of four players per chunk; every fourth chunk only holds pets of
+    # non-players and stays untouched. Chunks cycle through the compression types.
+    compressions = [GZIP, UNCOMPRESSED, ZLIB | EXTERNAL, ZLIB, ZLIB, ZLIB, ZLIB, ZLIB]
+    chunks = {}
+    for index in range(min(1024, max(8, players // 4))):
+        if index % 4 == 3:
+            owners = [converter_module.bytes_to_uuid(rnd.randbytes(16)) for _ in range(4)]
+        else:
+            owners = [player['Online_UUID'] for player in rnd.sample(player_list, min(4, players))]
+        compression = compressions[index % len(compressions)]
+        chunks[index] = (compression, entity_chunk(rnd, owners, compression & ~EXTERNAL, size))
+    write_region(root / 'world/entities' / 'r.0.0.mca', chunks)
+    write_database(root / 'plugins/Economy/economy.db', player_list)
+
+    run_dir = root / RUN_DIR
+    run_dir.mkdir()
+
+    config = {
+        'root_dir': str(root),
+        'changeUUID_folder_name': [
+            {'name': 'world/advancements', 'change_content': False},
+            {'name': 'world/playerdata', 'change_content': True},
+            {'name': 'world/stats', 'change_content': False},
+            {'name': 'world/ftbquests', 'change_content': True, 'max_depth': 1},
+            {'name': 'world/ftbteams/party', 'change_content': True},
+            {'name': 'world/ftbteams/player', 'change_content': True},
+        ],
+        'region_folder_name': ['world/entities'],
+        'database_files': ['plugins/Economy/economy.db'],
+        'player': player_list,
+        # Keep the files of every run out of the script folder
+        'log_file': str(run_dir / 'log.txt'),
+        'index_file': str(run_dir / 'uuid_index.json'),
+        'verify_file': str(run_dir / 'uuid_verify.json'),
+        'journal_file': str(run_dir / 'conversion_journal.jsonl'),
+        'profile_cache': str(run_dir / 'profile_cache.json'),
+    }
+    config_path = root / 'Info.json'
+    with open(config_path, 'w', encoding='utf-8') as file:
+        json.dump(config, file, indent=4)
+    return config_path
+
+
+def _file_digest(path: Path) -> str:
+    """Hash of a file; region files are hashed by their chunks, which may move when they grow,
+    and databases by their values, as SQLite counts every change in its header"""
+    digest = hashlib.sha256()
+    if path.suffix == '.mca':
+        for index, compression, payload in region_chunks(path):
+            digest.update(struct.pack('>iB', index, compression) + payload)
+    elif path.suffix == '.db':
+        digest.update(repr(list(database_values(path))).encode())
+    else:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def server_files(root: Path) -> List[Path]:
+    """Every file of the server except Info.json and the converter's run files"""
+    return [
+        path for path in sorted(root.rglob('*'))
+        if path.is_file() and path.name != 'Info.json' and path.relative_to(root).parts[0] != RUN_DIR
+    ]
+
+
+def snapshot(root: Path) -> Dict[str, str]:
+    """Hash every file of the server"""
+    return {path.relative_to(root).as_posix(): _file_digest(path) for path in server_files(root)}
+
+
+_HEX_START = re.compile(rb'(?=[0-9a-fA-F]{8})')
+
+
+def leftover_uuids(root: Path, source_uuids: List[str]) -> int:
+    """Count source UUIDs left in the server by brute force, independently of the converter
+
+    Every offset that starts 8 hex digits is checked for a UUID in either
+    text form, and every NBT int array of length 4 for a binary UUID. Region
+    chunks are decompressed first, and database values are checked one by one.
+    """
+    text = {player_uuid.encode() for player_uuid in source_uuids}
+    text |= {player_uuid.replace('-', '').encode() for player_uuid in source_uuids}
+    binary = {converter_module.uuid_to_bytes(player_uuid) for player_uuid in source_uuids}
+    count = 0
+    for path in server_files(root):
+        count += any(player_uuid in path.name.encode() for player_uuid in text)
+        if path.suffix == '.mcc':
+            # Read along with the chunk's region file
+            continue
+        if path.suffix == '.db':
+            for value in database_values(path):
+                if isinstance(value, str):
+                    count += value.lower().encode() in text
+                elif isinstance(value, bytes):
+                    count += value in binary
+            continue
+        if path.suffix == '.mca':
+            contents = []
+            for _, compression, payload in region_chunks(path):
+                compression &= ~EXTERNAL
+                contents.append(gzip.decompress(payload) if compression == GZIP else
+                                zlib.decompress(payload) if compression == ZLIB else payload)
+        else:
+            contents = [path.read_bytes()]
+            if contents[0][:2] == b'\x1f\x8b':
+                contents = [gzip.decompress(contents[0])]
+        for data in contents:
+            for match in _HEX_START.finditer(data):
+                i = match.start()
+                count += data[i:i + 36] in text or data[i:i + 32] in text
+            i = data.find(b'\x00\x00\x00\x04')
+            while i != -1:
+                count += data[i + 4:i + 20] in binary
+                i = data.find(b'\x00\x00\x00\x04', i + 1)
+    return count
+
+
+def run_conversion(config_path: Path, workers: int) -> Dict[str, Any]:
+    """Run one conversion, return its direction, timings and phase metrics"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        converter = converter_module.MinecraftUUIDConverter(str(config_path), workers=workers, verbose=False)
+        start = time.perf_counter()
+        converter.convert()
+        total = time.perf_counter() - start
+    if converter.failures:
+        raise RuntimeError(f"Conversion failed: {converter.failures[0]}")
+    return {
+        'direction': 'online->offline' if converter.mode_id == 1 else 'offline->online',
+        'total': total,
+        'phases': {name: metrics.seconds for name, metrics in converter.metrics.items()},
+        'metrics': {name: metrics.as_dict() for name, metrics in converter.metrics.items()},
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Generate servers, convert them there and back, return the results"""
+    runs: List[Dict[str, Any]] = []
+    round_trip = True
+    converted = True
+    for repeat in range(args.repeat):
+        root = Path(tempfile.mkdtemp(prefix='uuid_benchmark_'))
+        try:
+            start = time.perf_counter()
+            config_path = generate_server(root, args.players, args.files, args.size, args.density, args.seed)
+            generate_time = time.perf_counter() - start
+            before = snapshot(root)
+            with open(config_path, 'r', encoding='utf-8') as file:
+                player_list = json.load(file)['player']
+            server_bytes = sum(path.stat().st_size for path in server_files(root))
+
+            for _ in range(2):
+                run = run_conversion(config_path, args.workers)
+                run['repeat'] = repeat
+                run['generate'] = generate_time
+                run['files'] = len(before)
+                run['bytes'] = server_bytes
+                runs.append(run)
+                print(f"{run['direction']:>16}: {run['total']:.3f}s")
+                source = 'Online_UUID' if run['direction'] == 'online->offline' else 'Offline_UUID'
+                left = leftover_uuids(root, [player[source] for player in player_list])
+                if left:
+                    converted = False
+                    print(f"Conversion INCOMPLETE, {left} source UUID(s) left")
+
+            after = snapshot(root)
+            if after != before:
+                round_trip = False
+                changed = sorted(set(before.items()) ^ set(after.items()))
+                print(f"Round trip FAILED, {len(changed)} differing entries, e.g. {changed[0][0]}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'round_trip': round_trip,
+        'converted': converted,
+        'runs': runs,
+    }
+
+
+def summarize(results: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Best time of every phase per direction"""
+    summary: Dict[str, Dict[str, float]] = {}
+    for run in results['runs']:
+        best = summary.setdefault(run['direction'], {})
+        for phase, seconds in list(run['phases'].items()) + [('total', run['total'])]:
+            best[phase] = min(best.get(phase, seconds), seconds)
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None):
+    """Print best phase times, with the change against a baseline if given"""
+    for direction, phases in summary.items():
+        print(f"\n{direction}")
+        for phase, seconds in phases.items():
+            line = f"  {phase:<18}{seconds:>10.4f}s"
+            old = (baseline or {}).get(direction, {}).get(phase)
+            if old:
+                line += f"  {(seconds - old) / old:+.1%} vs baseline"
+            print(line)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the Minecraft server UUID converter")
+    parser.add_argument('--players', type=int, default=200, help="number of players")
+    parser.add_argument('--files', type=int, default=20, help="shared files in each FTB folder")
+    parser.add_argument('--size', type=int, default=4096, help="approximate size of each content file in bytes")
+    parser.add_argument('--density', type=float, default=2.0, help="player UUIDs per KiB of shared files")
+    parser.add_argument('--workers', type=int, default=1, help="converter workers")
+    parser.add_argument('--repeat', type=int, default=3, help="number of generated servers")
+    parser.add_argument('--seed', type=int, default=1, help="random seed of the generator")
+    parser.add_argument('--output', metavar='PATH', help="save the results as JSON")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    results['summary'] = summarize(results)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['summary']
+    print_summary(results['summary'], baseline)
+    print(f"\nRound trip: {'OK' if results['round_trip'] else 'FAILED'}")
+    print(f"Source UUIDs left: {'none' if results['converted'] else 'FOUND'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+        print(f"Results saved to: {args.output}")
+    sys.exit(0 if results['round_trip'] and results['converted'] else 1)
+
+
+if __name__ == "__main__":
+    main()